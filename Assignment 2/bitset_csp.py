@@ -0,0 +1,141 @@
+from typing import Any
+from collections import deque
+
+
+class BitsetCSP:
+    def __init__(
+        self,
+        variables: list[str],
+        domains: dict[str, set],
+        edges: list[tuple[str, str]],
+    ):
+        """Constructs a CSP where every domain is an int bitmask over a shared value table.
+
+        Takes the same arguments as CSP, so it can be used as a drop-in replacement
+        for problems where all edges are "not equal" constraints (like sudoku).
+
+        Parameters
+        ----------
+        variables : list[str]
+            The variables for the CSP
+        domains : dict[str, set]
+            The domains of the variables
+        edges : list[tuple[str, str]]
+            Pairs of variables that must not be assigned the same value
+        """
+        self.variables = variables
+        # value table, bit i of a mask means values[i] is in the domain
+        self.values = sorted(set().union(*(domains[var] for var in variables)))
+        self.bit = {value: 1 << i for i, value in enumerate(self.values)}
+        self.index = {var: i for i, var in enumerate(variables)}
+
+        self.masks = [0] * len(variables)
+        for var, i in self.index.items():
+            for value in domains[var]:
+                self.masks[i] |= self.bit[value]
+
+        neighbors = [set() for _ in variables]
+        self.arcs: list[tuple[int, int]] = []
+        for variable1, variable2 in edges:
+            i, j = self.index[variable1], self.index[variable2]
+            self.arcs.append((i, j))
+            self.arcs.append((j, i))
+            neighbors[i].add(j)
+            neighbors[j].add(i)
+        # tuples are faster to iterate than sets in the inner loops
+        self.neighbors = [tuple(sorted(n)) for n in neighbors]
+
+    @property
+    def domains(self) -> dict[str, set]:
+        """The current domains decoded back to sets of values."""
+        return {var: self.decode(self.masks[i]) for var, i in self.index.items()}
+
+    def decode(self, mask: int) -> set:
+        """Returns the set of values whose bits are set in mask."""
+        values = set()
+        while mask:
+            low = mask & -mask
+            values.add(self.values[low.bit_length() - 1])
+            mask ^= low
+        return values
+
+    def ac_3(self) -> bool:
+        """Performs AC-3 on the bitmask domains.
+
+        A value x of xi only loses its support in xj when the domain of xj is
+        exactly {x}, so revise() is a couple of integer operations.
+
+        Returns
+        -------
+        bool
+            False if a domain becomes empty, otherwise True
+        """
+        masks = self.masks
+        neighbors = self.neighbors
+
+        queue_ac3 = deque(self.arcs)
+        while queue_ac3:
+            xi, xj = queue_ac3.popleft()
+            dj = masks[xj]
+            # two or more values left in xj means every value of xi has support
+            if dj & (dj - 1):
+                continue
+            # an empty dj leaves no support for anything in xi
+            to_remove = masks[xi] & dj if dj else masks[xi]
+            if not to_remove:
+                continue
+            masks[xi] ^= to_remove
+            if masks[xi] == 0:
+                return False
+            for neighbor in neighbors[xi]:
+                if neighbor != xj:
+                    queue_ac3.append((neighbor, xi))
+        return True
+
+    def backtracking_search(self) -> None | dict[str, Any]:
+        """Performs backtracking search on the bitmask domains.
+
+        Explores the same tree as CSP.backtracking_search() (variables in order,
+        values in ascending order), so backtrack_calls and backtrack_failures are
+        directly comparable between the two.
+
+        Returns
+        -------
+        None | dict[str, Any]
+            A solution if any exists, otherwise None
+        """
+        masks = self.masks
+        neighbors = self.neighbors
+        n = len(self.variables)
+        # assigned[i] is the single bit assigned to variable i, 0 if unassigned
+        assigned = [0] * n
+
+        self.backtrack_calls = 0
+        self.backtrack_failures = 0
+
+        def backtrack(i: int) -> bool:
+            self.backtrack_calls += 1
+            if i == n:
+                return True
+
+            used = 0
+            for neighbor in neighbors[i]:
+                used |= assigned[neighbor]
+            candidates = masks[i] & ~used
+            while candidates:
+                # lowest bit first, the value table is sorted
+                value = candidates & -candidates
+                candidates ^= value
+                assigned[i] = value
+                if backtrack(i + 1):
+                    return True
+            assigned[i] = 0
+            self.backtrack_failures += 1
+            return False
+
+        if not backtrack(0):
+            return None
+        return {
+            var: self.values[assigned[i].bit_length() - 1]
+            for var, i in self.index.items()
+        }
@@ -0,0 +1,256 @@
+# Streaming loaders for large constraint problems: DIMACS graph colouring files (.col) and a small
+# text format that adds precedences and domains, read line by line into integer adjacency arrays.
+# Variables are numbered from 1 in the files and from 0 everywhere else.
+#   python constraint_files.py le450_15b.col --colours 15
+#
+# The constraint format is the DIMACS one with two more kinds of lines, so a .col file is also one:
+#   c <comment>
+#   p <edge|col|csp> <variables> <constraints> [<values>]   <values> gives the default domain 0..values-1
+#   e <u> <v>             u and v take different values
+#   < <u> <v> [<gap>]     u + gap <= v, gap is 1 if left out
+#   d <u> <low> <high>    the domain of u is low..high instead of the default
+# Lines of any other kind (like the vertex weights "n <u> <w>" of some .col files) are skipped.
+
+import gzip
+import sys
+import time
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from itertools import accumulate, islice
+
+from csp import CSP, Constraint, Precedes
+
+# lines per block of read_constraints()
+BLOCK_LINES = 1 << 14
+
+
+class ConstraintGraph:
+    def __init__(
+        self,
+        size: int,
+        sources: array,
+        targets: array,
+        precedences: tuple[array, array, array] | None = None,
+        domains: dict[int, range] | None = None,
+        values: int | None = None,
+    ):
+        """The "not equal" edges of a problem as compressed sparse rows, plus its precedences and domains.
+
+        The neighbours of variable v are adjacency[offsets[v]:offsets[v + 1]], sorted and without
+        repeats, so the graph takes 4 bytes per edge direction and 8 per variable whatever the
+        input looked like. Edges listed twice or in both directions (some .col files do) are
+        only kept once.
+
+        Parameters
+        ----------
+        size : int
+            The number of variables, numbered 0..size-1
+        sources : array
+            The first variable of every edge
+        targets : array
+            The second variable of every edge, the same length as sources
+        precedences : tuple[array, array, array] | None
+            (before, after, gaps), before[i] + gaps[i] <= after[i] for every i
+        domains : dict[int, range] | None
+            The variables that do not take the default domain
+        values : int | None
+            The size of the default domain 0..values-1, None if the file does not give one
+        """
+        self.size = size
+        self.before, self.after, self.gaps = precedences or (array('i'), array('i'), array('i'))
+        self.domains = domains or {}
+        self.values = values
+
+        # counting sort of both directions of every edge into one array...
+        degree = Counter(sources)
+        degree.update(targets)
+        offsets = array('q', [0])
+        offsets.extend(accumulate(degree.get(v, 0) for v in range(size)))
+        fill = offsets[:-1]
+        adjacency = array('i', bytes(4 * offsets[-1]))
+        for u, v in zip(sources, targets):
+            adjacency[fill[u]] = v
+            fill[u] += 1
+            adjacency[fill[v]] = u
+            fill[v] += 1
+        # ...then every row sorted with its repeats dropped
+        self.offsets = array('q', [0])
+        self.adjacency = array('i')
+        for v in range(size):
+            self.adjacency.extend(sorted(set(adjacency[offsets[v]:offsets[v + 1]])))
+            self.offsets.append(len(self.adjacency))
+        self.edges = len(self.adjacency) // 2
+
+    def neighbours(self, v: int) -> array:
+        return self.adjacency[self.offsets[v]:self.offsets[v + 1]]
+
+    def degree(self, v: int) -> int:
+        return self.offsets[v + 1] - self.offsets[v]
+
+    def to_csp(self, values: int | None = None) -> CSP:
+        """Returns the problem as a CSP over the variables 0..size-1, see CSP.from_neighbors().
+
+        The neighbour sets are built in one pass over the rows and used by the CSP as they are,
+        no edge list or per-edge constraint is made. Precedences get one Precedes object per
+        gap, shared by all of them.
+
+        Parameters
+        ----------
+        values : int | None
+            The size of the default domain (the number of colours), the one in the file if None
+        """
+        values = self.values if values is None else values
+        if values is None and len(self.domains) < self.size:
+            raise ValueError("The file gives no number of values, pass one")
+        default = range(values or 0)
+        variables = list(range(self.size))
+        domains = {v: set(self.domains.get(v, default)) for v in variables}
+        adjacency, offsets = self.adjacency, self.offsets
+        neighbors = {v: set(adjacency[offsets[v]:offsets[v + 1]]) for v in variables}
+
+        constraints: dict[int, dict[int, Constraint]] = {}
+        shared: dict[int, tuple[Constraint, Constraint]] = {}
+        for u, v, gap in zip(self.before, self.after, self.gaps):
+            if gap not in shared:
+                constraint = Precedes(gap)
+                shared[gap] = (constraint, constraint.reversed())
+            forward, backward = shared[gap]
+            existing = constraints.get(u, {}).get(v)
+            # the same precedence twice is fine, anything else between the pair is not
+            if existing is not forward and (existing is not None or v in neighbors[u]):
+                raise ValueError(f"More than one constraint between {u + 1} and {v + 1}")
+            constraints.setdefault(u, {})[v] = forward
+            constraints.setdefault(v, {})[u] = backward
+            neighbors[u].add(v)
+            neighbors[v].add(u)
+        return CSP.from_neighbors(variables, domains, neighbors, constraints)
+
+
+def read_lines(path: str) -> Iterator[str]:
+    """Yields the lines of a text file, decompressing it on the fly if the name ends with .gz."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as file:
+        yield from file
+
+
+def block_edges(fields: list[str], size: int) -> tuple[array, array] | None:
+    """The 0-based ends of a block of "e u v" lines split into fields, None if some edge is not valid."""
+    try:
+        us = array('i', map(int, fields[1::3]))
+        vs = array('i', map(int, fields[2::3]))
+    except (ValueError, OverflowError):
+        return None
+    if min(us) < 1 or max(us) > size or min(vs) < 1 or max(vs) > size or any(map(int.__eq__, us, vs)):
+        return None
+    return array('i', map((-1).__add__, us)), array('i', map((-1).__add__, vs))
+
+
+def read_constraints(lines: Iterable[str], name: str = "<input>") -> ConstraintGraph:
+    """Builds the ConstraintGraph of a .col or constraint file from its lines, looking at each line once.
+
+    The edges go straight into int arrays, so reading takes 8 bytes per edge on top of
+    the graph. name is only used in the error messages.
+    """
+    size = values = None
+    sources, targets = array('i'), array('i')
+    before, after, gaps = array('i'), array('i'), array('i')
+    domains: dict[int, range] = {}
+
+    def read_line(line_number: int, line: str):
+        nonlocal size, values
+        fields = line.split()
+        if not fields:
+            return
+        kind = fields[0]
+        try:
+            if kind == "e" or kind == "<":
+                if size is None:
+                    raise ValueError("constraint before the p line")
+                u, v = int(fields[1]) - 1, int(fields[2]) - 1
+                if not (0 <= u < size and 0 <= v < size) or u == v:
+                    raise ValueError(f"no constraint between {u + 1} and {v + 1} with {size} variables")
+                if kind == "e":
+                    sources.append(u)
+                    targets.append(v)
+                else:
+                    before.append(u)
+                    after.append(v)
+                    gaps.append(int(fields[3]) if len(fields) > 3 else 1)
+            elif kind == "p":
+                if size is not None:
+                    raise ValueError("second p line")
+                size = int(fields[2])
+                values = int(fields[4]) if len(fields) > 4 else None
+            elif kind == "d":
+                if size is None:
+                    raise ValueError("domain before the p line")
+                v = int(fields[1]) - 1
+                if not 0 <= v < size:
+                    raise ValueError(f"no variable {v + 1} with {size} variables")
+                domains[v] = range(int(fields[2]), int(fields[3]) + 1)
+        except (ValueError, IndexError) as error:
+            raise ValueError(f"{name}:{line_number}: can not read {line.strip()!r}: {error}") from None
+
+    # nearly every line of a big file is an edge, so a block of nothing but "e u v" lines is read
+    # with one split and a map(int) per column, four times faster than line by line
+    lines = iter(lines)
+    first = 1
+    while block := list(islice(lines, BLOCK_LINES)):
+        fields = " ".join(block).split()
+        edges = None
+        if size is not None and len(fields) == 3 * len(block) and fields[0::3].count("e") == len(block):
+            edges = block_edges(fields, size)
+        if edges is not None:
+            sources.extend(edges[0])
+            targets.extend(edges[1])
+        else:
+            # anything else, including the errors, goes through the line by line reader
+            for line_number, line in enumerate(block, first):
+                read_line(line_number, line)
+        first += len(block)
+    if size is None:
+        raise ValueError(f"{name}: no p line")
+    return ConstraintGraph(size, sources, targets, (before, after, gaps), domains, values)
+
+
+def load_constraints(path: str) -> ConstraintGraph:
+    """Reads a .col or constraint file, gzipped if the name ends with .gz."""
+    return read_constraints(read_lines(path), path)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Colour a DIMACS graph or solve a constraint file.")
+    parser.add_argument("path", help=".col or constraint file, gzipped if the name ends with .gz")
+    parser.add_argument("-k", "--colours", type=int, help="values per variable, the file's own if not given")
+    parser.add_argument("--inference", choices=["none", "fc", "mac"], default="fc")
+    parser.add_argument("--no-search", action="store_true", help="only read the file and build the CSP")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    graph = load_constraints(args.path)
+    t1 = time.perf_counter()
+    csp = graph.to_csp(args.colours)
+    t2 = time.perf_counter()
+    print(
+        f"{graph.size} variables, {graph.edges} edges and {len(graph.before)} precedences"
+        f" read in {t1 - t0:.2f}s, CSP built in {t2 - t1:.2f}s"
+    )
+    if args.no_search:
+        return
+
+    solution = None
+    if csp.ac_3():
+        solution = csp.backtracking_search(None if args.inference == "none" else args.inference, "mrv")
+    elapsed = time.perf_counter() - t2
+    calls = getattr(csp, "backtrack_calls", 0)
+    if solution is None:
+        print(f"No solution, {calls} backtrack calls in {elapsed:.2f}s")
+        sys.exit(1)
+    print(f"Solved with {len(set(solution.values()))} distinct values, {calls} backtrack calls in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,286 @@
-from typing import Any
-from queue import Queue
-import timeit
+from typing import Any, Callable, Iterator
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+
+class Constraint:
+    """A binary constraint between two variables.
+
+    The allowed (value1, value2) pairs are never listed, a constraint only has to
+    answer whether a given pair is allowed. Subclasses can override has_support()
+    when there is a faster way than trying every value of the other domain.
+    """
+
+    def allows(self, value1: Any, value2: Any) -> bool:
+        """Returns True if value1 for the first variable and value2 for the second are consistent."""
+        raise NotImplementedError
+
+    def has_support(self, value1: Any, domain2: set) -> bool:
+        """Returns True if some value in domain2 is consistent with value1."""
+        return any(self.allows(value1, value2) for value2 in domain2)
+
+    def conflicts(self, value1: Any, domain2: set) -> int:
+        """Returns how many values in domain2 are ruled out by value1."""
+        return sum(1 for value2 in domain2 if not self.allows(value1, value2))
+
+    def reversed(self) -> "Constraint":
+        """Returns the same constraint seen from the second variable."""
+        return Swapped(self)
+
+    def __contains__(self, pair: tuple[Any, Any]) -> bool:
+        # lets (value1, value2) in constraint keep working like it did on the old sets of pairs
+        return self.allows(*pair)
+
+    def key(self) -> tuple:
+        """What the constraint means, two constraints with the same key allow the same pairs.
+
+        Only the object itself by default, subclasses that know better override it.
+        """
+        return (type(self), id(self))
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Constraint) and self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+
+class NotEqual(Constraint):
+    def allows(self, value1, value2):
+        return value1 != value2
+
+    def has_support(self, value1, domain2):
+        # the only value that can not support value1 is value1 itself
+        return len(domain2) > 1 or value1 not in domain2
+
+    def conflicts(self, value1, domain2):
+        return 1 if value1 in domain2 else 0
+
+    def reversed(self):
+        return self
+
+    def key(self):
+        return (NotEqual,)
+
+
+class LessThan(Constraint):
+    def allows(self, value1, value2):
+        return value1 < value2
+
+    def has_support(self, value1, domain2):
+        return any(value1 < value2 for value2 in domain2)
+
+    def reversed(self):
+        return GreaterThan()
+
+    def key(self):
+        return (LessThan,)
+
+
+class GreaterThan(Constraint):
+    def allows(self, value1, value2):
+        return value1 > value2
+
+    def has_support(self, value1, domain2):
+        return any(value1 > value2 for value2 in domain2)
+
+    def reversed(self):
+        return LessThan()
+
+    def key(self):
+        return (GreaterThan,)
+
+
+class Precedes(Constraint):
+    def __init__(self, gap: int = 1):
+        """value1 + gap <= value2, like a task starting at value1 that takes gap time units before the next one."""
+        self.gap = gap
+
+    def allows(self, value1, value2):
+        return value1 + self.gap <= value2
+
+    def has_support(self, value1, domain2):
+        return any(value1 + self.gap <= value2 for value2 in domain2)
+
+    def key(self):
+        return (Precedes, self.gap)
+
+
+class Predicate(Constraint):
+    def __init__(self, predicate: Callable[[Any, Any], bool]):
+        """Wraps an arbitrary function predicate(value1, value2) -> bool."""
+        self.predicate = predicate
+
+    def allows(self, value1, value2):
+        return self.predicate(value1, value2)
+
+    def key(self):
+        return (Predicate, self.predicate)
+
+
+class Table(Constraint):
+    def __init__(self, allowed: set[tuple[Any, Any]]):
+        """An extensional constraint given by its set of allowed (value1, value2) pairs."""
+        self.allowed = allowed
+
+    def allows(self, value1, value2):
+        return (value1, value2) in self.allowed
+
+    def reversed(self):
+        return Table({(value2, value1) for value1, value2 in self.allowed})
+
+    def key(self):
+        return (Table, frozenset(self.allowed))
+
+
+class Swapped(Constraint):
+    def __init__(self, constraint: Constraint):
+        """The constraint with its two variables swapped."""
+        self.constraint = constraint
+
+    def allows(self, value1, value2):
+        return self.constraint.allows(value2, value1)
+
+    def reversed(self):
+        return self.constraint
+
+    def key(self):
+        return (Swapped, self.constraint.key())
+
+
+# every "not equal" edge shares this one object
+NOT_EQUAL = NotEqual()
+
+
+class NeighborConstraints(Mapping):
+    def __init__(self, neighbors: dict[Any, set], constraints: dict[Any, dict[Any, Constraint]] | None = None):
+        """The binary constraints of a CSP read off its neighbour sets, see CSP.from_neighbors().
+
+        (a, b) maps to constraints[a][b] if it is there and to NOT_EQUAL for any other pair of
+        neighbours, so nothing is stored per edge beyond the neighbour sets themselves.
+        """
+        self.neighbors = neighbors
+        self.constraints = constraints or {}
+
+    def __getitem__(self, arc: tuple[Any, Any]) -> Constraint:
+        a, b = arc
+        other = self.constraints.get(a)
+        if other is not None and b in other:
+            return other[b]
+        if b in self.neighbors[a]:
+            return NOT_EQUAL
+        raise KeyError(arc)
+
+    def __iter__(self) -> Iterator[tuple[Any, Any]]:
+        for a, neighbours in self.neighbors.items():
+            for b in neighbours:
+                yield a, b
+
+    def __len__(self) -> int:
+        return sum(map(len, self.neighbors.values()))
+
+
+class BucketQueue:
+    def __init__(self, max_size: int, max_degree: int):
+        """Unassigned variables bucketed by domain size and by number of unassigned neighbours.
+
+        first() finds the variable with the smallest domain, ties broken by the largest
+        degree, by scanning the buckets only, so it does not depend on the number of variables.
+
+        Parameters
+        ----------
+        max_size : int
+            The largest domain size that will be added
+        max_degree : int
+            The largest degree that will be added
+        """
+        # buckets[size][degree] is a dict used as an insertion ordered set, to keep the search deterministic
+        self.buckets: list[list[dict[str, None]]] = [
+            [{} for _ in range(max_degree + 1)] for _ in range(max_size + 1)
+        ]
+        # number of variables with each domain size, lets first() skip empty sizes
+        self.counts = [0] * (max_size + 1)
+        self.keys: dict[str, tuple[int, int]] = {}
+
+    def add(self, var: str, size: int, degree: int):
+        self.keys[var] = (size, degree)
+        self.buckets[size][degree][var] = None
+        self.counts[size] += 1
+
+    def remove(self, var: str):
+        size, degree = self.keys.pop(var)
+        del self.buckets[size][degree][var]
+        self.counts[size] -= 1
+
+    def set_size(self, var: str, size: int):
+        """Moves var to a new domain size, does nothing if var is not in the queue."""
+        key = self.keys.get(var)
+        if key is not None and key[0] != size:
+            self.remove(var)
+            self.add(var, size, key[1])
+
+    def add_degree(self, var: str, delta: int):
+        """Changes the degree of var by delta, does nothing if var is not in the queue."""
+        key = self.keys.get(var)
+        if key is not None:
+            self.remove(var)
+            self.add(var, key[0], key[1] + delta)
+
+    def first(self) -> str | None:
+        for size, count in enumerate(self.counts):
+            if count:
+                for bucket in reversed(self.buckets[size]):
+                    if bucket:
+                        return next(iter(bucket))
+        return None
+
+
+class NogoodStore:
+    def __init__(self, max_size: int):
+        """Partial assignments proven to have no solution, for the backjumping search.
+
+        Each nogood is a frozenset of (variable, value) pairs, indexed by every pair so that
+        checking a value only looks at the nogoods containing it. When the store is full
+        the least recently used nogood is evicted.
+
+        Parameters
+        ----------
+        max_size : int
+            The largest number of nogoods kept
+        """
+        self.max_size = max_size
+        self.nogoods: OrderedDict[frozenset, None] = OrderedDict()
+        self.index: dict[tuple[str, Any], list[frozenset]] = {}
+        self.hits = 0
+        self.evictions = 0
+
+    def add(self, nogood: frozenset):
+        if nogood in self.nogoods:
+            self.nogoods.move_to_end(nogood)
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.index.setdefault(pair, []).append(nogood)
+        if len(self.nogoods) > self.max_size:
+            old, _ = self.nogoods.popitem(last=False)
+            for pair in old:
+                indexed = self.index[pair]
+                indexed.remove(old)
+                if not indexed:
+                    del self.index[pair]
+            self.evictions += 1
+
+    def violated(self, var: str, value: Any, assignment: dict[str, Any]) -> frozenset | None:
+        """Returns a nogood that assigning value to var would complete, None if there is none."""
+        for nogood in self.index.get((var, value), ()):
+            if all(other == var or other in assignment and assignment[other] == v for other, v in nogood):
+                self.hits += 1
+                self.nogoods.move_to_end(nogood)
+                return nogood
+        return None
+
+    def __len__(self) -> int:
+        return len(self.nogoods)
+
 
 class CSP:
     def __init__(
@@ -8,6 +288,8 @@ class CSP:
         variables: list[str],
         domains: dict[str, set],
         edges: list[tuple[str, str]],
+        constraints: dict[tuple[str, str], Constraint] | None = None,
+        all_different: list[list[str]] | None = None,
     ):
         """Constructs a CSP instance with the given variables, domains and edges.
 
@@ -19,39 +301,171 @@ class CSP:
             The domains of the variables
         edges : list[tuple[str, str]]
             Pairs of variables that must not be assigned the same value
+        constraints : dict[tuple[str, str], Constraint] | None
+            Any other binary constraints, keyed by the pair of variables they constrain
+        all_different : list[list[str]] | None
+            Groups of variables that must all take different values (like the units of a sudoku).
+            The search still checks them pair by pair, but AC-3 propagates every group as a
+            whole instead of revising its pairwise arcs, see ac_3()
         """
         self.variables = variables
         self.domains = domains
+        self.units: list[tuple[str, ...]] = [tuple(unit) for unit in all_different or ()]
+        # units_of[var] are the indices of the groups var is in
+        self.units_of: dict[str, list[int]] = {var: [] for var in variables}
+        unit_edges = []
+        for u, unit in enumerate(self.units):
+            for var in unit:
+                self.units_of[var].append(u)
+            unit_edges += alldiff(list(unit))
+
+        # one constraint object per direction of every edge, the allowed pairs are never built
+        self.binary_constraints: dict[tuple[str, str], Constraint] = {}
+        all_constraints = [(variable1, variable2, NOT_EQUAL) for variable1, variable2 in edges + unit_edges]
+        if constraints is not None:
+            all_constraints += [(a, b, c) for (a, b), c in constraints.items()]
+        for variable1, variable2, constraint in all_constraints:
+            # repeated edges are fine (sudoku rows and boxes overlap), and so is a constraint given
+            # from both sides, like LessThan on (a, b) and GreaterThan on (b, a), conflicting ones are not
+            existing = self.binary_constraints.get((variable1, variable2))
+            if existing is not None and existing != constraint:
+                raise ValueError(f"More than one constraint between {variable1} and {variable2}")
+            self.binary_constraints[(variable1, variable2)] = constraint
+            self.binary_constraints[(variable2, variable1)] = constraint.reversed()
 
-        self.binary_constraints: dict[tuple[str, str], set] = {}
-        for variable1, variable2 in edges:
-            self.binary_constraints[(variable1, variable2)] = set()
-            self.binary_constraints[(variable2, variable1)] = set()
-
-            for value1 in self.domains[variable1]:
-                for value2 in self.domains[variable2]:
-                    if value1 != value2:
-                        self.binary_constraints[(variable1, variable2)].add(
-                            (value1, value2)
-                        )
-                        self.binary_constraints[(variable2, variable1)].add(
-                            (value2, value1)
-                        )
         self.neighbors = {var: set() for var in variables}
         # make a neighbor , type is dict of set
-        for a, b in edges:
+        for a, b, _ in all_constraints:
             self.neighbors[a].add(b)
             self.neighbors[b].add(a)
 
-    def ac_3(self) -> bool:
+        # the arcs AC-3 revises, the ones inside an all-different group are left to the group
+        self.arcs: list[tuple[str, str]] = list(self.binary_constraints)
+        self.arc_neighbors = self.neighbors
+        if unit_edges:
+            covered = set(unit_edges)
+            covered.update((b, a) for a, b in unit_edges)
+            self.arcs = [arc for arc in self.arcs if arc not in covered]
+            self.arc_neighbors = {var: set() for var in variables}
+            for a, b in self.arcs:
+                self.arc_neighbors[a].add(b)
+        # filled in by the first search and shared with every with_domains() copy
+        self.search_order: dict[str, dict] = {}
+
+    @classmethod
+    def from_neighbors(
+        cls,
+        variables: list[Any],
+        domains: dict[Any, set],
+        neighbors: dict[Any, set],
+        constraints: dict[Any, dict[Any, Constraint]] | None = None,
+    ) -> "CSP":
+        """Constructs a CSP from the neighbour sets of its variables instead of a list of edges.
+
+        Every two neighbours must take different values, unless constraints[a][b] is another
+        constraint for the pair (with the reversed one in constraints[b][a]). The neighbour
+        sets are used as they are and no constraint is stored per edge, which is what makes
+        graphs with millions of edges fit, see constraint_files.py.
+
+        Parameters
+        ----------
+        variables : list[Any]
+            The variables for the CSP
+        domains : dict[Any, set]
+            The domains of the variables
+        neighbors : dict[Any, set]
+            neighbors[a] are the variables sharing a constraint with a, b in neighbors[a] if and only if a in neighbors[b]
+        constraints : dict[Any, dict[Any, Constraint]] | None
+            The constraints between neighbours that are not "not equal"
+        """
+        csp = cls.__new__(cls)
+        csp.variables = variables
+        csp.domains = domains
+        csp.binary_constraints = NeighborConstraints(neighbors, constraints)
+        csp.neighbors = neighbors
+        csp.units = []
+        csp.units_of = dict.fromkeys(variables, ())
+        # AC-3 only iterates over the arcs to fill its queue, so the mapping can stand in for the list
+        csp.arcs = csp.binary_constraints
+        csp.arc_neighbors = neighbors
+        csp.search_order = {}
+        return csp
+
+    def with_domains(self, domains: dict[str, set]) -> "CSP":
+        """Returns a CSP with the same variables and constraints but the given domains.
+
+        The constraints and neighbours are shared with this CSP instead of being rebuilt,
+        which makes it cheap to solve many problems with the same structure.
+        """
+        csp = CSP.__new__(CSP)
+        csp.variables = self.variables
+        csp.domains = domains
+        csp.binary_constraints = self.binary_constraints
+        csp.neighbors = self.neighbors
+        csp.units = self.units
+        csp.units_of = self.units_of
+        csp.arcs = self.arcs
+        csp.arc_neighbors = self.arc_neighbors
+        csp.search_order = self.search_order
+        return csp
+
+    def ac_3(
+        self,
+        arcs: list[tuple[str, str]] | None = None,
+        trail: list[tuple[str, Any]] | None = None,
+        algorithm: str = "ac3",
+        stats=None,
+        units: list[int] | None = None,
+    ) -> bool:
         """Performs AC-3 on the CSP.
         Meant to be run prior to calling backtracking_search() to reduce the search for some problems.
 
+        The number of revisions and of support checks (calls to has_support() or allows())
+        are left in self.ac_revisions and self.ac_checks.
+
+        The all-different groups are propagated alongside the arcs, each one until nothing changes:
+        a set of k cells with the same k values left (naked singles and pairs) takes those values
+        from the rest of the group, and when the group has to use every value, a value that fits
+        only one cell (a hidden single) goes there. A group also fails when it has fewer values
+        than cells. This is stronger than arc consistency on the pairwise "not equal" arcs,
+        which is all a group gives up.
+
+        Parameters
+        ----------
+        arcs : list[tuple[str, str]] | None
+            The arcs to start from, all arcs if None. MAC passes only the arcs
+            pointing at the variable that was just assigned.
+        trail : list[tuple[str, Any]] | None
+            If given, every removed (variable, value) is appended so the removals can be undone
+        algorithm : str
+            "ac3" revises whole arcs, "ac2001" remembers the last support found for every
+            value so a revision resumes from there, "ac4" counts the supports of every value
+            once and then only decrements the counters. "ac4" always starts from all arcs,
+            and works on the pairwise arcs of the all-different groups.
+        stats : search_stats.SearchStats | None
+            If given, stats.revision() is called for every revision that removes values
+        units : list[int] | None
+            The all-different groups (indices into self.units) to start from along with arcs,
+            every group if arcs is None
+
         Returns
         -------
         bool
             False if a domain becomes empty, otherwise True
         """
+        if algorithm not in ("ac3", "ac2001", "ac4"):
+            raise ValueError(f"Unknown algorithm {algorithm!r}, expected 'ac3', 'ac2001' or 'ac4'")
+        if algorithm == "ac4" and arcs is not None:
+            raise ValueError("ac4 builds its support counters from all arcs, it can not start from a subset")
+        self.ac_revisions = 0
+        self.ac_checks = 0
+
+        def remove(xi: str, to_remove: set):
+            self.domains[xi] -= to_remove
+            if stats is not None:
+                stats.revision(len(to_remove))
+            if trail is not None:
+                trail.extend((xi, x) for x in to_remove)
 
         def revise(xi: str, xj: str) -> bool:
             """Revises the domain of xi to satisfy the constraint between xi and xj.
@@ -68,128 +482,577 @@ class CSP:
             """
 
             revised = False
-            # allowed pairs for the constraint between xi and xj, it is type of set of tuple
-            allowed = self.binary_constraints.get((xi, xj), set())
-            # pairs that need to be removed from the domain of xi
+            constraint = self.binary_constraints[(xi, xj)]
+            self.ac_checks += len(self.domains[xi])
+            # values that need to be removed from the domain of xi
             to_remove = set()
             for x in self.domains[xi]:
-                
-                if all((x, y) not in allowed for y in self.domains[xj]):
+                if not constraint.has_support(x, self.domains[xj]):
                     to_remove.add(x)
             if to_remove:
-                self.domains[xi] -= to_remove
+                remove(xi, to_remove)
                 revised = True
             return revised
 
-        queue_ac3 = Queue()
-        for xi, xj in self.binary_constraints:
-            # add all arcs to the queue
-            queue_ac3.put((xi, xj))
-        while queue_ac3.empty() is False:
+        # AC-2001: last[(xi, xj, x)] is the position in order[xj] of the last support of x,
+        # values before it have already been rejected, so the next search resumes after it
+        last: dict[tuple[str, str, Any], int] = {}
+        order: dict[str, list[Any]] = {}
+
+        def revise_2001(xi: str, xj: str) -> bool:
+            """Same as revise(), but resumes each support search from the last support found."""
+            constraint = self.binary_constraints[(xi, xj)]
+            domain_j = self.domains[xj]
+            if xj not in order:
+                order[xj] = sorted(domain_j)
+            values_j = order[xj]
+            to_remove = set()
+            for x in self.domains[xi]:
+                position = last.get((xi, xj, x))
+                if position is None:
+                    position = 0
+                elif values_j[position] in domain_j:
+                    continue
+                else:
+                    position += 1
+                for position in range(position, len(values_j)):
+                    y = values_j[position]
+                    if y in domain_j:
+                        self.ac_checks += 1
+                        if constraint.allows(x, y):
+                            last[(xi, xj, x)] = position
+                            break
+                else:
+                    to_remove.add(x)
+            if to_remove:
+                remove(xi, to_remove)
+                return True
+            return False
+
+        def ac_4() -> bool:
+            # counter[(xi, xj, x)] is how many values of xj support x,
+            # supported[(xj, y)] lists the (xi, x) that y supports
+            counter: dict[tuple[str, str, Any], int] = {}
+            supported: dict[tuple[str, Any], list[tuple[str, Any]]] = {}
+            deleted: list[tuple[str, Any]] = []
+            for xi, xj in self.binary_constraints:
+                constraint = self.binary_constraints[(xi, xj)]
+                to_remove = set()
+                for x in self.domains[xi]:
+                    count = 0
+                    for y in self.domains[xj]:
+                        self.ac_checks += 1
+                        if constraint.allows(x, y):
+                            count += 1
+                            supported.setdefault((xj, y), []).append((xi, x))
+                    counter[(xi, xj, x)] = count
+                    if count == 0:
+                        to_remove.add(x)
+                if to_remove:
+                    remove(xi, to_remove)
+                    if not self.domains[xi]:
+                        return False
+                    deleted.extend((xi, x) for x in to_remove)
+
+            while deleted:
+                xj, y = deleted.pop()
+                for xi, x in supported.get((xj, y), ()):
+                    if x not in self.domains[xi]:
+                        continue
+                    self.ac_revisions += 1
+                    counter[(xi, xj, x)] -= 1
+                    if counter[(xi, xj, x)] == 0:
+                        remove(xi, {x})
+                        if not self.domains[xi]:
+                            return False
+                        deleted.append((xi, x))
+            return True
+
+        def revise_unit(u: int) -> bool:
+            """Propagates an all-different group until it stops changing, returns False if it fails."""
+            unit = self.units[u]
+            domains = self.domains
+            changed = set()
+            again = True
+            while again:
+                again = False
+                # naked singles and pairs: count the cells with each 1 or 2 value domain
+                naked: dict[frozenset, int] = {}
+                for var in unit:
+                    if len(domains[var]) <= 2:
+                        values = frozenset(domains[var])
+                        naked[values] = naked.get(values, 0) + 1
+                for values, count in naked.items():
+                    if count < len(values):
+                        continue
+                    if count > len(values):
+                        return False
+                    for var in unit:
+                        domain = domains[var]
+                        if domain != values and not domain.isdisjoint(values):
+                            self.ac_checks += len(domain)
+                            remove(var, domain & values)
+                            if not domain:
+                                return False
+                            changed.add(var)
+                            again = True
+
+                # hidden singles, only if every value has to be used
+                places: dict[Any, list[str]] = {}
+                for var in unit:
+                    for value in domains[var]:
+                        places.setdefault(value, []).append(var)
+                self.ac_checks += len(places)
+                if len(places) < len(unit):
+                    return False
+                if len(places) > len(unit):
+                    continue
+                for value, cells in places.items():
+                    if len(cells) == 1:
+                        domain = domains[cells[0]]
+                        if value not in domain:
+                            # another hidden single took the cell
+                            return False
+                        if len(domain) > 1:
+                            remove(cells[0], domain - {value})
+                            changed.add(cells[0])
+                            again = True
+
+            for var in changed:
+                for neighbor in self.arc_neighbors[var]:
+                    if (neighbor, var) not in pending:
+                        pending.add((neighbor, var))
+                        queue_ac3.append((neighbor, var))
+                for other in self.units_of[var]:
+                    if other != u and other not in units_pending:
+                        units_pending.add(other)
+                        units_queue.append(other)
+            return True
+
+        if algorithm == "ac4":
+            return ac_4()
+
+        revise_arc = revise_2001 if algorithm == "ac2001" else revise
+        # deque instead of queue.Queue, no locking, and pending makes sure an arc is in the queue at most once
+        queue_ac3 = deque(self.arcs if arcs is None else arcs)
+        pending = set(queue_ac3)
+        # the all-different groups wait in their own queue, and are only propagated once the arcs are done
+        units_queue = deque(range(len(self.units)) if arcs is None else units or ())
+        units_pending = set(units_queue)
+        while queue_ac3 or units_queue:
+            if not queue_ac3:
+                u = units_queue.popleft()
+                units_pending.discard(u)
+                self.ac_revisions += 1
+                if not revise_unit(u):
+                    return False
+                continue
             # we remove an arc from the queue, FIFO
-            (xi, xj) = queue_ac3.get()
+            (xi, xj) = queue_ac3.popleft()
+            pending.discard((xi, xj))
+            self.ac_revisions += 1
             # if the domain of xi is revised or not
-            if revise(xi, xj) is True:
+            if revise_arc(xi, xj) is True:
                 if len(self.domains[xi]) == 0:
                     return False
-                for neighbor in self.neighbors[xi]:
-                    if neighbor != xj:
-                        queue_ac3.put((neighbor, xi))
+                for neighbor in self.arc_neighbors[xi]:
+                    if neighbor != xj and (neighbor, xi) not in pending:
+                        pending.add((neighbor, xi))
+                        queue_ac3.append((neighbor, xi))
+                for u in self.units_of[xi]:
+                    if u not in units_pending:
+                        units_pending.add(u)
+                        units_queue.append(u)
         return True
 
-    def backtracking_search(self) -> None | dict[str, Any]:
+    def backtracking_search(
+        self,
+        inference: str | None = None,
+        variable_ordering: str = "static",
+        value_ordering: str = "sorted",
+        stats=None,
+        backjumping: bool = False,
+        nogoods: int | None = None,
+    ) -> None | dict[str, Any]:
         """Performs backtracking search on the CSP.
 
+        Takes the same arguments as solutions() and returns its first solution.
+
         Returns
         -------
         None | dict[str, Any]
             A solution if any exists, otherwise None
         """
+        # the generator is dropped after the first solution, so the search stops there,
+        # and the solution is a copy since it is kept after that
+        search = self.solutions(inference, variable_ordering, value_ordering, stats, True, backjumping, nogoods)
+        for solution in search:
+            return solution
+        return None
 
-        def satisfy_constraint(variable, value, assignment):
-            """Checks if the assignment of a value to a variable satisfies all constraints.
+    def count_solutions(
+        self,
+        limit: int | None = None,
+        inference: str | None = None,
+        variable_ordering: str = "static",
+        value_ordering: str = "sorted",
+        stats=None,
+        backjumping: bool = False,
+        nogoods: int | None = None,
+    ) -> int:
+        """Counts the solutions, stopping as soon as limit are found.
 
-            Args:
-                variable (str): The variable being assigned.
-                value (Any): The value being assigned to the variable.
-                assignment (dict[str, Any]): The current assignment of values to variables.
+        limit=2 is enough to tell whether a puzzle has a unique solution. The other
+        arguments are the same as for solutions().
 
-            Returns:
-                bool: True if the assignment is consistent with all constraints, False otherwise.
-            """
-            # check only neighbour constraints
-            for neighbour in self.neighbors[variable]:
-                if neighbour not in assignment:
-                    continue
-                
-                # Get the allowed pairs for this constraint
-                allowed = self.binary_constraints.get((variable, neighbour), set())
-                pair = (value, assignment[neighbour])
-                
-                # Check if this pair is allowed by the constraint
-                if pair not in allowed:
-                    return False
+        Returns
+        -------
+        int
+            The number of solutions, at most limit
+        """
+        count = 0
+        if limit is not None and limit <= 0:
+            return count
+        for _ in self.solutions(inference, variable_ordering, value_ordering, stats, False, backjumping, nogoods):
+            count += 1
+            if count == limit:
+                break
+        return count
 
-            return True
+    def solutions(
+        self,
+        inference: str | None = None,
+        variable_ordering: str = "static",
+        value_ordering: str = "sorted",
+        stats=None,
+        copy: bool = False,
+        backjumping: bool = False,
+        nogoods: int | None = None,
+    ) -> Iterator[dict[str, Any]]:
+        """Yields the solutions of the CSP one at a time, found by backtracking search.
+
+        The search resumes where it stopped when the next solution is asked for, so a
+        caller that stops early pays only for the part of the tree it has seen. The
+        counters self.backtrack_calls and self.backtrack_failures cover the search so far.
+        The domains are restored once every solution has been yielded, a search that is
+        stopped early leaves them pruned like backtracking_search() does.
 
-        def order_domain_values(var: str) -> list[Any]:
+        Parameters
+        ----------
+        inference : str | None
+            None only checks each assignment against the assigned neighbours,
+            "fc" (forward checking) also prunes the domains of the unassigned neighbours,
+            "mac" (maintaining arc consistency) runs AC-3 from the assigned variable.
+            Pruned values are kept on an undo trail, so no domains are copied per node.
+        variable_ordering : str
+            "static" picks the first unassigned variable in self.variables,
+            "mrv" picks the one with the fewest values left, ties broken by the most
+            unassigned neighbours (degree). The candidates are kept in a BucketQueue
+            that is updated as domains shrink and grow.
+        value_ordering : str
+            "sorted" tries the values in ascending order, "lcv" (least constraining value)
+            tries first the values that rule out the fewest values of the unassigned neighbours.
+        stats : search_stats.SearchStats | None
+            If given, gets a node() for every node of the search tree, a prune() for every value
+            rejected by a constraint check or a failed inference, and the revisions of the inference
+        copy : bool
+            If False (the default) the search's own assignment is yielded, the same dict every
+            time, and the search changes it as soon as the next solution is asked for. Pass
+            True to get a new dict per solution that can be kept, e.g. for list(solutions())
+        backjumping : bool
+            Conflict-directed backjumping (CBJ, FC-CBJ with "fc"). Every variable keeps a
+            conflict set of the assigned variables that ruled out its values, and when it
+            runs out of values the search jumps back to the latest of them instead of the
+            previous variable. Not available with "mac".
+        nogoods : int | None
+            With backjumping, the size of a NogoodStore that remembers the assignments
+            behind every dead end and rejects values that would repeat one, None for no store.
+            The store of the last search is left in self.nogood_store
+
+        Yields
+        ------
+        dict[str, Any]
+            Every solution, in search order
+        """
+
+        def order_domain_values(var: str, assignment: dict[str, Any]) -> list[Any]:
             """Returns the domain values of a variable.
             Parameters
             ----------
             var : str
                 A variable
+            assignment : dict[str, Any]
+                The current assignment, used by "lcv" to find the unassigned neighbours
                 Returns
                 -------
                 list[Any]
                     The domain values of the variable
             """
-            return sorted(self.domains[var])
+            domain = self.domains[var]
+            # the domains only lose values during the search, filtering the sorted order is cheaper than sorting
+            values = [value for value in value_order[var] if value in domain]
+            if value_ordering == "lcv":
+                neighbours = [
+                    (self.binary_constraints[(var, neighbour)], self.domains[neighbour])
+                    for neighbour in self.neighbors[var]
+                    if neighbour not in assignment
+                ]
+                # stable sort, equally constraining values stay in ascending order
+                values.sort(key=lambda value: sum(c.conflicts(value, d) for c, d in neighbours))
+            return values
 
-        def select_unassigned_variable(assignment: dict[str, Any]) -> str | None:
-            """Selects an unassigned variable from the CSP.
+        def infer(
+            variable: str,
+            value: Any,
+            assignment: dict[str, Any],
+            trail: list[tuple[str, Any]],
+            pruned: list[str] | None = None,
+        ) -> bool:
+            """Prunes the domains after assigning value to variable, recording every removal on the trail.
 
-            Args:
-                assignment (dict[str, Any]): The current assignment of values to variables.
+            With forward checking, the neighbours that lost values are appended to pruned if
+            it is given, so after a failure the last one is the neighbour that was wiped out.
 
-            Returns:
-                str | None: The first unassigned variable found, or None if all variables are assigned.
+            Returns
+            -------
+            bool
+                False if some domain became empty, otherwise True
             """
-            # Any unassigned variable
-            for v in self.variables:
-                if v not in assignment:
-                    return v
-            return None
+            # the assigned variable keeps only its value, so AC-3 sees it as a singleton
+            domain = self.domains[variable]
+            trail.extend((variable, other) for other in domain if other != value)
+            domain.intersection_update((value,))
+
+            if inference == "fc":
+                for neighbour in self.neighbors[variable]:
+                    if neighbour in assignment:
+                        continue
+                    constraint = self.binary_constraints[(neighbour, variable)]
+                    neighbour_domain = self.domains[neighbour]
+                    to_remove = [y for y in neighbour_domain if not constraint.allows(y, value)]
+                    if to_remove:
+                        if stats is not None:
+                            stats.revision(len(to_remove))
+                        if pruned is not None:
+                            pruned.append(neighbour)
+                    for y in to_remove:
+                        neighbour_domain.remove(y)
+                        trail.append((neighbour, y))
+                    if not neighbour_domain:
+                        return False
+                return True
+
+            return self.ac_3(
+                arcs=[(neighbour, variable) for neighbour in self.arc_neighbors[variable] if neighbour not in assignment],
+                trail=trail,
+                stats=stats,
+                units=self.units_of[variable],
+            )
+
+        def undo(trail: list[tuple[str, Any]], mark: int):
+            """Puts back every value removed since the trail had length mark."""
+            while len(trail) > mark:
+                variable, value = trail.pop()
+                self.domains[variable].add(value)
+
+        def resize(changed: list[tuple[str, Any]]):
+            """Moves the variables whose domains changed to their new buckets."""
+            # in variable order, so the buckets fill the same way whatever order the sets iterated in
+            for variable in sorted({variable for variable, _ in changed}, key=rank.__getitem__):
+                queue.set_size(variable, len(self.domains[variable]))
+
+        if inference not in (None, "fc", "mac"):
+            raise ValueError(f"Unknown inference {inference!r}, expected None, 'fc' or 'mac'")
+        if variable_ordering not in ("static", "mrv"):
+            raise ValueError(f"Unknown variable ordering {variable_ordering!r}, expected 'static' or 'mrv'")
+        if value_ordering not in ("sorted", "lcv"):
+            raise ValueError(f"Unknown value ordering {value_ordering!r}, expected 'sorted' or 'lcv'")
+        if backjumping and inference == "mac":
+            raise ValueError("backjumping needs inference None or 'fc', AC-3 does not record why values were removed")
+
+        value_order = {var: sorted(self.domains[var]) for var in self.variables}
+        queue = None
+        if not self.search_order:
+            rank = {var: i for i, var in enumerate(self.variables)}
+            self.search_order["rank"] = rank
+            # the neighbour sets iterate in hash order, which changes from run to run for strings
+            self.search_order["neighbors"] = {
+                var: sorted(self.neighbors[var], key=rank.__getitem__) for var in self.variables
+            }
+            # (neighbour, constraint) pairs, so checking a value does no tuple building or dict lookups
+            self.search_order["checks"] = {
+                var: [(neighbour, self.binary_constraints[(var, neighbour)]) for neighbour in self.neighbors[var]]
+                for var in self.variables
+            }
+        rank = self.search_order["rank"]
+        ordered_neighbors = self.search_order["neighbors"]
+        checks = self.search_order["checks"]
+        if variable_ordering == "mrv":
+            queue = BucketQueue(
+                max(len(domain) for domain in self.domains.values()),
+                max(len(neighbours) for neighbours in self.neighbors.values()),
+            )
+            for var in self.variables:
+                queue.add(var, len(self.domains[var]), len(self.neighbors[var]))
+        trail: list[tuple[str, Any]] = []
         self.backtrack_calls = 0
         self.backtrack_failures = 0
         
-        def backtrack(assignment: dict[str, Any]):
-            """Performs backtracking search to find a solution to the CSP.
-            Parameters
-            ----------
-            assignment : dict[str, Any]
-                The current assignment of values to variables
-            Returns
-            -------
-            None | dict[str, Any]
-                A solution if any exists, otherwise None
-            """
-            self.backtrack_calls += 1
-            if len(assignment) == len(self.variables):
-                return assignment
-
-            unassigned_variable = select_unassigned_variable(assignment)
-            # check domain and if it satisfies constraint
-            for state in order_domain_values(unassigned_variable):
-                if satisfy_constraint(unassigned_variable, state, assignment):
-                    assignment[unassigned_variable] = state
-                    result = backtrack(assignment)
-                    if result is not None:
-                        return result
-                    del assignment[unassigned_variable]
-            self.backtrack_failures += 1
-            return None
-
-        return backtrack({})
+        # The search keeps its own stack instead of recursing, so the number of variables is
+        # not limited by Python's recursion limit. Every frame is one node of the search tree:
+        # [variable, its values in order, index of the next value, its MRV key, found a solution,
+        # trail length before the current value's inference or None if no value is assigned,
+        # conflict set, neighbours pruned by the current value's forward checking]
+        # The last two are None without backjumping.
+        variables = self.variables
+        assignment: dict[str, Any] = {}
+        stack: list[list] = []
+        # level[var] is the index in stack of the frame that assigned var
+        level: dict[str, int] = {}
+        # pruned_by[var] lists the assigned variables whose forward checking removed values of var
+        pruned_by: dict[str, list[str]] = {var: [] for var in variables} if backjumping else {}
+        store = NogoodStore(nogoods) if backjumping and nogoods else None
+        self.nogood_store = store
+
+        def retract(frame: list):
+            """Takes back the current value of the frame's variable and everything inferred from it."""
+            var, mark, pruned = frame[0], frame[5], frame[7]
+            if inference is not None:
+                if queue is not None:
+                    changed = trail[mark:]
+                    undo(trail, mark)
+                    resize(changed)
+                else:
+                    undo(trail, mark)
+            if pruned:
+                for neighbour in pruned:
+                    pruned_by[neighbour].pop()
+                pruned.clear()
+            del assignment[var]
+
+        def pop_frame():
+            var, size_degree = stack[-1][0], stack[-1][3]
+            stack.pop()
+            if queue is not None:
+                # every removal made below this node has been undone, so the old key is still right
+                queue.add(var, *size_degree)
+                for neighbour in ordered_neighbors[var]:
+                    if neighbour not in assignment:
+                        queue.add_degree(neighbour, 1)
+
+        # None when a new node has to be expanded, otherwise whether the node that just
+        # finished found a solution
+        returning: bool | None = None
+        while True:
+            if returning is None:
+                self.backtrack_calls += 1
+                if stats is not None:
+                    stats.node(len(assignment))
+                if len(assignment) == len(variables):
+                    yield dict(assignment) if copy else assignment
+                    returning = True
+                    if not stack:
+                        return
+                else:
+                    size_degree = None
+                    if queue is not None:
+                        var = queue.first()
+                        size_degree = queue.keys[var]
+                        queue.remove(var)
+                        for neighbour in ordered_neighbors[var]:
+                            if neighbour not in assignment:
+                                queue.add_degree(neighbour, -1)
+                    else:
+                        # the static order assigns a prefix of self.variables, so the next one is at index len(assignment)
+                        var = variables[len(assignment)]
+                    level[var] = len(stack)
+                    stack.append([
+                        var, order_domain_values(var, assignment), 0, size_degree, False, None,
+                        set() if backjumping else None, [] if backjumping else None,
+                    ])
+
+            frame = stack[-1]
+            var, values, i, size_degree, found, mark, conflicts, pruned = frame
+            if returning is not None and mark is not None:
+                # the subtree below the current value is done, take the value back
+                found = found or returning
+                retract(frame)
+            returning = None
+
+            # try the remaining values until one can be descended into
+            var_checks = checks[var]
+            while i < len(values):
+                value = values[i]
+                i += 1
+                if store is not None:
+                    nogood = store.violated(var, value, assignment)
+                    if nogood is not None:
+                        conflicts.update(other for other, _ in nogood if other != var)
+                        if stats is not None:
+                            stats.prune(len(assignment) + 1)
+                        continue
+                # check only neighbour constraints, with fc and mac every value left in the
+                # domain is already consistent with the assigned neighbours
+                for neighbour, constraint in () if inference is not None else var_checks:
+                    if neighbour in assignment and not constraint.allows(value, assignment[neighbour]):
+                        break
+                else:
+                    assignment[var] = value
+                    mark = len(trail)
+                    if inference is None or infer(var, value, assignment, trail, pruned):
+                        # a failed inference is undone straight away, the queue never sees it
+                        if inference is not None and queue is not None:
+                            resize(trail[mark:])
+                        if pruned:
+                            for neighbour in pruned:
+                                pruned_by[neighbour].append(var)
+                        break
+                    if stats is not None:
+                        stats.prune(len(assignment))
+                    if pruned:
+                        # the wiped out neighbour lost its other values to these variables
+                        conflicts.update(pruned_by[pruned[-1]])
+                        pruned.clear()
+                    undo(trail, mark)
+                    del assignment[var]
+                    continue
+                if conflicts is not None:
+                    conflicts.add(neighbour)
+                if stats is not None:
+                    stats.prune(len(assignment) + 1)
+            else:
+                # every value is exhausted, backtrack
+                if not found:
+                    self.backtrack_failures += 1
+                if conflicts is None or found:
+                    # chronologically, after a solution the conflict set would be every earlier variable
+                    pop_frame()
+                    returning = found
+                    if not stack:
+                        return
+                    continue
+
+                # no value of var works as long as the culprits keep their values
+                culprits = conflicts.union(pruned_by[var])
+                if store is not None:
+                    store.add(frozenset((culprit, assignment[culprit]) for culprit in culprits))
+                pop_frame()
+                if not culprits:
+                    # var fails whatever the other variables are, there are no more solutions
+                    while stack:
+                        retract(stack[-1])
+                        pop_frame()
+                    return
+                # jump back to the latest culprit, the variables after it can not help
+                target = max(culprits, key=level.__getitem__)
+                while stack[-1][0] != target:
+                    retract(stack[-1])
+                    pop_frame()
+                culprits.discard(target)
+                stack[-1][6].update(culprits)
+                returning = False
+                continue
+            frame[2], frame[4], frame[5] = i, found, mark
 
 
 def alldiff(variables: list[str]) -> list[tuple[str, str]]:
@@ -2,7 +2,6 @@
 # The CSP.ac_3() and CSP.backtrack() methods need to be implemented
 
 from csp import CSP, alldiff
-import time
 
 def print_solution(solution):
     """
@@ -34,22 +33,21 @@ def domain_summary(domains):
         - singles: The number of domains with a single value
         - total: The total size of all domains
     """
-        sizes = [len(domains[v]) for v in sorted(domains)]
-        return {
-            "min": min(sizes),
-            "max": max(sizes),
-            "avg": sum(sizes)/len(sizes),
-            "singles": sum(1 for s in sizes if s == 1),
-            "total": sum(sizes)
-        }
+    sizes = [len(domains[v]) for v in sorted(domains)]
+    return {
+        "min": min(sizes),
+        "max": max(sizes),
+        "avg": sum(sizes)/len(sizes),
+        "singles": sum(1 for s in sizes if s == 1),
+        "total": sum(sizes)
+    }
 sudoku_files = ["sudoku_easy.txt", "sudoku_medium.txt", "sudoku_hard.txt","sudoku_very_hard.txt"]
 
-for sudoku_file in sudoku_files:
-    grid = open(sudoku_file).read().split()
-
-    width = 9
-    box_width = 3
+width = 9
+box_width = 3
 
+def sudoku_domains(grid: list[str]) -> dict[str, set]:
+    """Returns the domains for a 9x9 grid given as nine strings of digits, 0 for empty cells."""
     domains = {}
     for row in range(width):
         for col in range(width):
@@ -57,42 +55,98 @@ for sudoku_file in sudoku_files:
                 domains[f'X{row+1}{col+1}'] = set(range(1, 10))
             else:
                 domains[f'X{row+1}{col+1}'] = {int(grid[row][col])}
+    return domains
 
-    edges = []
+def sudoku_units() -> list[list[str]]:
+    """Returns the 27 rows, columns and boxes of a 9x9 grid."""
+    units = []
     for row in range(width):
-        edges += alldiff([f'X{row+1}{col+1}' for col in range(width)])
+        units.append([f'X{row+1}{col+1}' for col in range(width)])
     for col in range(width):
-        edges += alldiff([f'X{row+1}{col+1}' for row in range(width)])
+        units.append([f'X{row+1}{col+1}' for row in range(width)])
     for box_row in range(box_width):
         for box_col in range(box_width):
-            cells = []
-            edges += alldiff(
+            units.append(
                 [
                     f'X{row+1}{col+1}' for row in range(box_row * box_width, (box_row + 1) * box_width)
                     for col in range(box_col * box_width, (box_col + 1) * box_width)
                 ]
             )
+    return units
 
-    csp = CSP(
+def sudoku_csp(grid: list[str], all_different: bool = False) -> CSP:
+    """Builds the CSP for a 9x9 grid given as nine strings of digits, 0 for empty cells.
+
+    With all_different the 27 units are n-ary all-different constraints, so AC-3 also finds
+    hidden singles and naked pairs, otherwise every unit is broken into pairwise edges.
+    """
+    units = sudoku_units()
+    if all_different:
+        return CSP(
+            variables=[f'X{row+1}{col+1}' for row in range(width) for col in range(width)],
+            domains=sudoku_domains(grid),
+            edges=[],
+            all_different=units,
+        )
+    edges = []
+    for unit in units:
+        edges += alldiff(unit)
+
+    return CSP(
         variables=[f'X{row+1}{col+1}' for row in range(width) for col in range(width)],
-        domains=domains,
+        domains=sudoku_domains(grid),
         edges=edges,
     )
 
-    print(f"Solving {sudoku_file}:")
-    t0 = time.perf_counter()
-    csp.ac_3()
-    t1 = time.perf_counter()
-    print("AC3 time:", round(t1 - t0, 5))
-    print(domain_summary(csp.domains))
-    t2 = time.perf_counter()
-    solution = csp.backtracking_search()
-    t3 = time.perf_counter()
-    print_solution(solution)
-    print("Backtrack time:", round(t3 - t2, 5))
-    print("total time:", round((t1 - t0) + (t3 - t2), 5))
-    print("Backtrack calls:", csp.backtrack_calls)
-    print("Backtrack failures:", csp.backtrack_failures)
+inference_modes = [None, "fc", "mac"]
+
+def main():
+    """Solves the sudoku files given on the command line, or the four in this directory."""
+    import os
+    import sys
+    import time
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    for sudoku_file in sys.argv[1:] or [os.path.join(here, name) for name in sudoku_files]:
+        grid = open(sudoku_file).read().split()
+
+        csp = sudoku_csp(grid)
+
+        print(f"Solving {sudoku_file}:")
+        t0 = time.perf_counter()
+        csp.ac_3()
+        t1 = time.perf_counter()
+        print("AC3 time:", round(t1 - t0, 5))
+        print(domain_summary(csp.domains))
+        t2 = time.perf_counter()
+        solution = csp.backtracking_search()
+        t3 = time.perf_counter()
+        print_solution(solution)
+        print("Backtrack time:", round(t3 - t2, 5))
+        print("total time:", round((t1 - t0) + (t3 - t2), 5))
+        print("Backtrack calls:", csp.backtrack_calls)
+        print("Backtrack failures:", csp.backtrack_failures)
+
+        # same puzzle with each inference mode, the search modifies the domains so every run gets a fresh CSP
+        # and with the units as all-different constraints, where AC-3 finds hidden singles and naked pairs too
+        print(f"{'inference':>10} {'units':>6} {'calls':>8} {'failures':>9} {'time':>9}")
+        for all_different in (False, True):
+            for inference in inference_modes:
+                csp = sudoku_csp(grid, all_different)
+                csp.ac_3()
+                t0 = time.perf_counter()
+                assert csp.backtracking_search(inference=inference) == solution
+                t1 = time.perf_counter()
+                print(
+                    f"{str(inference):>10} {str(all_different):>6} {csp.backtrack_calls:>8}"
+                    f" {csp.backtrack_failures:>9} {t1 - t0:>9.5f}"
+                )
+        print()
+
+
+if __name__ == "__main__":
+    main()
+
 # Expected output after implementing csp.ac_3() and csp.backtracking_search():
 # True
 # 7 8 4 | 9 3 2 | 1 5 6
@@ -0,0 +1,254 @@
+# Batch sudoku solving.
+# Reads one puzzle per line (81 cells, 0 or . for an empty cell, 16x16 and 25x25 boards
+# use the symbols in sudoku_topology.SYMBOLS) and writes one JSON line
+# per puzzle with the solution and the search statistics, e.g.
+#   python sudoku_batch.py puzzles.txt -o solutions.jsonl --workers 8 --chunk-size 200
+# With --cache results.db every result is kept in a persistent cache, so puzzles solved
+# by an earlier run (with the same options) are looked up instead of solved again.
+
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from itertools import chain, islice
+
+from sudoku_topology import SYMBOLS, sudoku_topology, topology_for
+
+
+def read_puzzles(path: str) -> Iterator[str]:
+    """Yields the puzzles in a file one line at a time.
+
+    Blank lines and lines starting with # are skipped, '.' is accepted for an empty cell.
+    The symbols are checked here for the size of the board, so a bad line fails with its
+    line number instead of inside a worker.
+    """
+    # board width from the number of cells
+    widths = {16: 4, 81: 9, 256: 16, 625: 25}
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if len(line) not in widths:
+                raise ValueError(f"{path}:{line_number}: expected 16, 81, 256 or 625 cells, got {len(line)}")
+            allowed = SYMBOLS[:widths[len(line)]] + "0."
+            if not set(line) <= set(allowed):
+                cell, symbol = next((cell, symbol) for cell, symbol in enumerate(line) if symbol not in allowed)
+                raise ValueError(f"{path}:{line_number}: cell {cell} is {symbol!r}, expected one of {allowed}")
+            yield line
+
+
+# the cache of this worker process, opened by init_worker()
+worker_cache = None
+
+
+def open_cache(path: str, max_entries: int = 100_000):
+    """Opens the persistent_cache.PersistentCache at path."""
+    # persistent_cache.py is shared with Assignment 3 and lives in the repository root
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.append(root)
+    from persistent_cache import PersistentCache
+
+    return PersistentCache(path, max_entries)
+
+
+def init_worker(
+    cache_path: str | None = None,
+    cache_size: int = 100_000,
+    box_width: int | None = None,
+    all_different: bool = False,
+):
+    global worker_cache
+    # the topology of the batch's first puzzle is built before any chunk arrives, other sizes the first time they show up
+    if box_width is not None:
+        sudoku_topology(box_width, all_different)
+    if cache_path is not None:
+        worker_cache = open_cache(cache_path, cache_size)
+
+
+def solve_puzzle(
+    puzzle: str,
+    inference: str | None,
+    variable_ordering: str,
+    value_ordering: str,
+    check_unique: bool = False,
+    all_different: bool = False,
+    cache=None,
+) -> dict:
+    """Solves one puzzle with the cached topology for its size and returns the solution and statistics.
+
+    With check_unique the search goes on for a second solution, and the result gets a "unique" flag.
+    With all_different the units are propagated as all-different constraints.
+    With a persistent_cache.PersistentCache the result is looked up first and stored after
+    solving, and gets a "cached" flag. The key is the puzzle with '.' for empty cells and the
+    options, since the options can change which solution is found first.
+    """
+    topology = topology_for(puzzle, all_different)
+    if cache is not None:
+        key = f"sudoku/{topology.format(topology.parse(puzzle))}/{inference}/{variable_ordering}/{value_ordering}"
+        key += f"/{check_unique}/{all_different}"
+        result = cache.get(key)
+        if result is not None:
+            return {**result, "cached": True}
+    csp = topology.csp_for(puzzle)
+
+    t0 = time.perf_counter()
+    consistent = csp.ac_3()
+    t1 = time.perf_counter()
+    solutions = []
+    if consistent:
+        search = csp.solutions(inference, variable_ordering, value_ordering, copy=False)
+        # each solution is formatted before the search moves on and changes it
+        solutions = [
+            topology.format([solution[cell] for cell in csp.variables])
+            for solution in islice(search, 2 if check_unique else 1)
+        ]
+    solution = solutions[0] if solutions else None
+    t2 = time.perf_counter()
+
+    result = {
+        "solution": solution,
+        "ac3_time": t1 - t0,
+        "search_time": t2 - t1,
+        # AC-3 alone can prove there is no solution, then the search never runs
+        "backtrack_calls": csp.backtrack_calls if consistent else 0,
+        "backtrack_failures": csp.backtrack_failures if consistent else 0,
+    }
+    if check_unique:
+        result["unique"] = len(solutions) == 1
+    if cache is not None:
+        cache.put(key, result)
+        result["cached"] = False
+    return result
+
+
+def solve_chunk(chunk: list[tuple[int, str]], *options) -> list[dict]:
+    results = [{"index": index, **solve_puzzle(puzzle, *options, cache=worker_cache)} for index, puzzle in chunk]
+    if worker_cache is not None:
+        # the pool does not close the workers' caches, so the hit counts are written per chunk
+        worker_cache.flush()
+    return results
+
+
+def solve_batch(
+    puzzles: Iterable[str],
+    workers: int | None = None,
+    chunk_size: int = 64,
+    inference: str | None = "fc",
+    variable_ordering: str = "mrv",
+    value_ordering: str = "sorted",
+    check_unique: bool = False,
+    all_different: bool = False,
+    cache_path: str | None = None,
+    cache_size: int = 100_000,
+) -> Iterator[dict]:
+    """Solves puzzles across a process pool and yields the results as chunks complete.
+
+    Only 2 * workers chunks are in flight at any time, and puzzles are read from the
+    iterable only when a chunk is submitted, so memory does not grow with the input.
+    Results come in completion order, each one carries the "index" of its puzzle.
+
+    Parameters
+    ----------
+    puzzles : Iterable[str]
+        Puzzles with one symbol per cell, 0 or . for an empty cell, e.g. read_puzzles(path)
+    workers : int | None
+        Number of worker processes, os.cpu_count() if None
+    chunk_size : int
+        Number of puzzles sent to a worker at a time
+    inference, variable_ordering, value_ordering
+        Passed on to CSP.solutions()
+    check_unique : bool
+        Also search for a second solution and report whether the first one is "unique"
+    all_different : bool
+        Propagate the units as all-different constraints instead of pairwise edges
+    cache_path : str | None
+        A persistent cache file shared by the workers, see solve_puzzle()
+    cache_size : int
+        The most results the cache keeps, the least recently used are evicted
+    """
+    # the pool is only imported by the code that starts one, importing this module stays cheap
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    workers = workers or os.cpu_count() or 1
+    options = (inference, variable_ordering, value_ordering, check_unique, all_different)
+    numbered = enumerate(puzzles)
+    # the first puzzle tells the workers which topology to build up front
+    first = next(numbered, None)
+    if first is None:
+        return
+    numbered = chain([first], numbered)
+    box_width = next((width for width in range(2, 6) if width ** 4 == len(first[1])), None)
+
+    initargs = (cache_path, cache_size, box_width, all_different)
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=initargs) as executor:
+        pending = set()
+        while chunk := list(islice(numbered, chunk_size)):
+            pending.add(executor.submit(solve_chunk, chunk, *options))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield from future.result()
+
+
+def main():
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Solve a file of sudoku puzzles, one per line.")
+    parser.add_argument("puzzles", help="file with one puzzle per line")
+    parser.add_argument("-o", "--output", help="where to write the JSON lines, stdout if not given")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    parser.add_argument("--inference", choices=["none", "fc", "mac"], default="fc")
+    parser.add_argument("--variable-ordering", choices=["static", "mrv"], default="mrv")
+    parser.add_argument("--value-ordering", choices=["sorted", "lcv"], default="sorted")
+    parser.add_argument("--check-unique", action="store_true", help="report whether each puzzle has exactly one solution")
+    parser.add_argument("--all-different", action="store_true",
+                        help="propagate rows, columns and boxes as all-different constraints (hidden singles, naked pairs)")
+    parser.add_argument("--cache", help="persistent cache file for the results, reused across runs")
+    parser.add_argument("--cache-size", type=int, default=100_000, help="most results kept in the cache")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else sys.stdout
+    solved = total = cached = 0
+    t0 = time.perf_counter()
+    try:
+        for result in solve_batch(
+            read_puzzles(args.puzzles),
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            inference=None if args.inference == "none" else args.inference,
+            variable_ordering=args.variable_ordering,
+            value_ordering=args.value_ordering,
+            check_unique=args.check_unique,
+            all_different=args.all_different,
+            cache_path=args.cache,
+            cache_size=args.cache_size,
+        ):
+            output.write(json.dumps(result) + "\n")
+            total += 1
+            solved += result["solution"] is not None
+            cached += result.get("cached", False)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - t0
+    print(f"{solved}/{total} solved in {elapsed:.2f}s ({total / elapsed:.1f} puzzles/s)", file=sys.stderr)
+    if args.cache:
+        with open_cache(args.cache, args.cache_size) as cache:
+            stats = cache.stats()
+        print(
+            f"{cached}/{total} from the cache, {stats['entries']} entries,"
+            f" hit rate over all runs {stats['total_hit_rate']:.1%}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Sudoku constraint topology, built once per board size and reused for every puzzle.
+# Cells are numbered row by row from 0, so cell (row, col) is row * width + col.
+
+from functools import lru_cache
+
+from csp import CSP, alldiff
+
+# cell symbols for boards up to 25x25, '0' and '.' mark an empty cell
+SYMBOLS = "123456789ABCDEFGHIJKLMNOP"
+
+
+class SudokuTopology:
+    def __init__(self, box_width: int, all_different: bool = False):
+        """The units, peers and constraint graph of a sudoku with box_width x box_width boxes.
+
+        Parameters
+        ----------
+        box_width : int
+            2, 3, 4 or 5 for 4x4, 9x9, 16x16 and 25x25 boards
+        all_different : bool
+            If True the units are given to the CSP as all-different constraints,
+            otherwise only as pairwise edges
+        """
+        if not 1 < box_width <= 5:
+            raise ValueError(f"box_width must be between 2 and 5, got {box_width}")
+        self.box_width = box_width
+        self.width = box_width * box_width
+        self.cells = self.width * self.width
+        width = self.width
+
+        rows = [[row * width + col for col in range(width)] for row in range(width)]
+        cols = [[row * width + col for row in range(width)] for col in range(width)]
+        boxes = [
+            [
+                row * width + col
+                for row in range(box_row * box_width, (box_row + 1) * box_width)
+                for col in range(box_col * box_width, (box_col + 1) * box_width)
+            ]
+            for box_row in range(box_width)
+            for box_col in range(box_width)
+        ]
+        self.units: list[tuple[int, ...]] = [tuple(unit) for unit in rows + cols + boxes]
+
+        # every pair of cells once, a box shares pairs with its rows and columns
+        edges = {edge for unit in self.units for edge in alldiff(list(unit))}
+        self.edges: list[tuple[int, int]] = sorted(edges)
+
+        self.full_domain = frozenset(range(1, width + 1))
+        self.csp = CSP(
+            variables=list(range(self.cells)),
+            domains={cell: set(self.full_domain) for cell in range(self.cells)},
+            edges=[] if all_different else self.edges,
+            all_different=[list(unit) for unit in self.units] if all_different else None,
+        )
+        self.peers: list[tuple[int, ...]] = [tuple(sorted(self.csp.neighbors[cell])) for cell in range(self.cells)]
+
+    def parse(self, puzzle: str) -> list[int]:
+        """Converts a puzzle string with one symbol per cell into cell values, 0 for empty cells."""
+        if len(puzzle) != self.cells:
+            raise ValueError(f"Expected {self.cells} cells for a {self.width}x{self.width} sudoku, got {len(puzzle)}")
+        symbols = SYMBOLS[:self.width]
+        values = []
+        for cell, symbol in enumerate(puzzle):
+            if symbol in "0.":
+                values.append(0)
+            elif symbol in symbols:
+                values.append(symbols.index(symbol) + 1)
+            else:
+                raise ValueError(
+                    f"Cell {cell} is {symbol!r}, a {self.width}x{self.width} sudoku only has"
+                    f" {symbols}, '0' and '.'"
+                )
+        return values
+
+    def format(self, values: list[int]) -> str:
+        """The inverse of parse()."""
+        return "".join("." if value == 0 else SYMBOLS[value - 1] for value in values)
+
+    def domains(self, puzzle: str | list[int]) -> dict[int, set]:
+        """Returns fresh domains for a puzzle, the full domain for empty cells and the given otherwise."""
+        values = self.parse(puzzle) if isinstance(puzzle, str) else puzzle
+        full_domain = self.full_domain
+        return {cell: {value} if value else set(full_domain) for cell, value in enumerate(values)}
+
+    def csp_for(self, puzzle: str | list[int]) -> CSP:
+        """Returns a CSP for the puzzle that shares all constraints with self.csp."""
+        return self.csp.with_domains(self.domains(puzzle))
+
+
+@lru_cache(maxsize=None)
+def sudoku_topology(box_width: int = 3, all_different: bool = False) -> SudokuTopology:
+    """Returns the SudokuTopology for the board size, building it only the first time."""
+    return SudokuTopology(box_width, all_different)
+
+
+def topology_for(puzzle: str, all_different: bool = False) -> SudokuTopology:
+    """Returns the SudokuTopology matching the length of a puzzle string."""
+    for box_width in range(2, 6):
+        if len(puzzle) == box_width ** 4:
+            return sudoku_topology(box_width, all_different)
+    raise ValueError(f"{len(puzzle)} cells is not a 4x4, 9x9, 16x16 or 25x25 sudoku")
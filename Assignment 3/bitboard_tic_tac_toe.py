@@ -0,0 +1,227 @@
+# Tic-tac-toe on bitboards.
+# Cell (row, col) is bit 3 * row + col, and each player's pieces are one 9-bit int,
+# so a state is a hashable (player, x_bits, o_bits) and moves never copy a board.
+
+import math
+
+State = tuple[int, int, int]  # (player to move, P1's bits, P2's bits)
+Action = tuple[int, int]  # Where to place the player's piece, same as tic_tac_toe.Action
+NestedState = tuple[int, list[list[int | None]]]  # tic_tac_toe.State
+
+FULL = 0b111111111
+WIN_MASKS = (
+    0b000000111, 0b000111000, 0b111000000,  # rows
+    0b001001001, 0b010010010, 0b100100100,  # columns
+    0b100010001, 0b001010100,  # diagonals
+)
+# IS_WIN[bits] is True if bits contains a complete line, so a win check is one list lookup
+IS_WIN = [any(bits & mask == mask for mask in WIN_MASKS) for bits in range(FULL + 1)]
+# EMPTY_CELLS[occupied] lists the free cells in order
+EMPTY_CELLS = [[cell for cell in range(9) if not occupied >> cell & 1] for occupied in range(FULL + 1)]
+
+
+class BitboardGame:
+    """The tic_tac_toe.Game rules on (player, x_bits, o_bits) states."""
+
+    def initial_state(self) -> State:
+        return 0, 0, 0
+
+    def to_move(self, state: State) -> int:
+        return state[0]
+
+    def actions(self, state: State) -> list[Action]:
+        _, x_bits, o_bits = state
+        return [divmod(cell, 3) for cell in EMPTY_CELLS[x_bits | o_bits]]
+
+    def result(self, state: State, action: Action) -> State:
+        player, x_bits, o_bits = state
+        bit = 1 << (3 * action[0] + action[1])
+        if player == 0:
+            return 1, x_bits | bit, o_bits
+        return 0, x_bits, o_bits | bit
+
+    def is_winner(self, state: State, player: int) -> bool:
+        return IS_WIN[state[1 + player]]
+
+    def is_terminal(self, state: State) -> bool:
+        _, x_bits, o_bits = state
+        return IS_WIN[x_bits] or IS_WIN[o_bits] or x_bits | o_bits == FULL
+
+    def utility(self, state: State, player: int) -> float:
+        assert self.is_terminal(state)
+        if IS_WIN[state[1 + player]]:
+            return 1
+        if IS_WIN[state[2 - player]]:
+            return -1
+        return 0
+
+    def print(self, state: State):
+        NestedListGame().print(to_nested(state))
+
+
+def to_nested(state: State) -> NestedState:
+    """Converts a bitboard state to the nested-list state used by tic_tac_toe.Game."""
+    player, x_bits, o_bits = state
+    board = [
+        [0 if x_bits >> (3 * row + col) & 1 else 1 if o_bits >> (3 * row + col) & 1 else None for col in range(3)]
+        for row in range(3)
+    ]
+    return player, board
+
+
+def from_nested(state: NestedState) -> State:
+    """Converts a tic_tac_toe.Game state to a bitboard state."""
+    player, board = state
+    bits = [0, 0]
+    for row in range(3):
+        for col in range(3):
+            if board[row][col] is not None:
+                bits[board[row][col]] |= 1 << (3 * row + col)
+    return player, bits[0], bits[1]
+
+
+class NestedListGame:
+    """The tic_tac_toe.Game API on nested-list states, with the rules checked on bitboards.
+
+    Lets code written against the nested-list states keep working, while best_action()
+    hands the position to the in-place bitboard search.
+    """
+
+    bitboard = BitboardGame()
+
+    def initial_state(self) -> NestedState:
+        return to_nested(self.bitboard.initial_state())
+
+    def to_move(self, state: NestedState) -> int:
+        return state[0]
+
+    def actions(self, state: NestedState) -> list[Action]:
+        return self.bitboard.actions(from_nested(state))
+
+    def result(self, state: NestedState, action: Action) -> NestedState:
+        return to_nested(self.bitboard.result(from_nested(state), action))
+
+    def is_winner(self, state: NestedState, player: int) -> bool:
+        return self.bitboard.is_winner(from_nested(state), player)
+
+    def is_terminal(self, state: NestedState) -> bool:
+        return self.bitboard.is_terminal(from_nested(state))
+
+    def utility(self, state: NestedState, player: int) -> float:
+        return self.bitboard.utility(from_nested(state), player)
+
+    def best_action(self, state: NestedState) -> Action | None:
+        return best_action(from_nested(state))
+
+    def print(self, state: NestedState):
+        _, board = state
+        print()
+        for row in range(3):
+            cells = [
+                ' ' if board[row][col] is None else 'x' if board[row][col] == 0 else 'o'
+                for col in range(3)
+            ]
+            print(f' {cells[0]} | {cells[1]} | {cells[2]}')
+            if row < 2:
+                print('---+---+---')
+        print()
+        if self.is_terminal(state):
+            if self.utility(state, 0) > 0:
+                print('P1 won')
+            elif self.utility(state, 1) > 0:
+                print('P2 won')
+            else:
+                print('The game is a draw')
+        else:
+            print(f'It is P{self.to_move(state)+1}\'s turn to move')
+
+
+class Board:
+    __slots__ = ("bits", "player", "moves")
+
+    def __init__(self, state: State = (0, 0, 0)):
+        """A mutable position for the search, moves are made and undone in place."""
+        player, x_bits, o_bits = state
+        self.bits = [x_bits, o_bits]
+        self.player = player
+        self.moves: list[int] = []
+
+    def make_move(self, cell: int):
+        self.bits[self.player] |= 1 << cell
+        self.moves.append(cell)
+        self.player ^= 1
+
+    def undo_move(self):
+        self.player ^= 1
+        self.bits[self.player] ^= 1 << self.moves.pop()
+
+    def legal_moves(self) -> list[int]:
+        return EMPTY_CELLS[self.bits[0] | self.bits[1]]
+
+    def state(self) -> State:
+        return self.player, self.bits[0], self.bits[1]
+
+
+# negamax() values by x_bits | o_bits << 9, the player to move follows from the number of pieces,
+# so the full search visits each of the 5478 reachable positions once
+NEGAMAX_VALUES: dict[int, int] = {}
+
+
+def negamax(board: Board) -> int:
+    """Returns the full minimax value of the position for the player to move (1, 0 or -1), memoised."""
+    key = board.bits[0] | board.bits[1] << 9
+    v = NEGAMAX_VALUES.get(key)
+    if v is not None:
+        return v
+    # only the player who just moved can have completed a line
+    if IS_WIN[board.bits[board.player ^ 1]]:
+        v = -1
+    elif not (moves := board.legal_moves()):
+        v = 0
+    else:
+        v = -math.inf
+        for cell in moves:
+            board.make_move(cell)
+            v = max(v, -negamax(board))
+            board.undo_move()
+    NEGAMAX_VALUES[key] = v
+    return v
+
+
+def negamax_alphabeta(board: Board, alpha: float, beta: float) -> int:
+    """Same as negamax(), but skips the moves that can not change the result."""
+    if IS_WIN[board.bits[board.player ^ 1]]:
+        return -1
+    moves = board.legal_moves()
+    if not moves:
+        return 0
+    v = -math.inf
+    for cell in moves:
+        board.make_move(cell)
+        v = max(v, -negamax_alphabeta(board, -beta, -alpha))
+        board.undo_move()
+        if v >= beta:
+            return v
+        alpha = max(alpha, v)
+    return v
+
+
+def best_action(state: State, prune: bool = True) -> Action | None:
+    """Returns the first best action for the player to move, like minimax_search and alphabeta_search."""
+    board = Board(state)
+    if IS_WIN[board.bits[board.player ^ 1]]:
+        return None
+    best_cell = None
+    best_value = -math.inf
+    for cell in board.legal_moves():
+        board.make_move(cell)
+        if prune:
+            # a child can only matter if it beats best_value
+            v = -negamax_alphabeta(board, -math.inf, -best_value)
+        else:
+            v = -negamax(board)
+        board.undo_move()
+        if v > best_value:
+            best_value = v
+            best_cell = cell
+    return None if best_cell is None else divmod(best_cell, 3)
@@ -1,5 +1,3 @@
-import math
-from halving_game import minimax_search
 State = tuple[int, list[str | int]]  # (player, buckets or numbers)
 Action = str | int  # bucket choice or number choice
 
@@ -53,14 +51,21 @@ class Game:
             print(f'it is P{self.to_move(state) + 1}\'s turn')
 
 
+def main():
+    """Plays a game with minimax for both players."""
+    from halving_game import minimax_search
 
-game = Game()
-state = game.initial_state()
-game.print(state)
-
-while not game.is_terminal(state):
-    player = game.to_move(state)
-    action = minimax_search(game, state)
-    print(f'P{player + 1}\'s action: {action}')
-    state = game.result(state, action)
+    game = Game()
+    state = game.initial_state()
     game.print(state)
+
+    while not game.is_terminal(state):
+        player = game.to_move(state)
+        action = minimax_search(game, state)
+        print(f'P{player + 1}\'s action: {action}')
+        state = game.result(state, action)
+        game.print(state)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import math
 
+from transposition import EXACT
+
 State = tuple[int, int]  # (player, number)
 Action = str  # '--' or '/2'
 
@@ -53,36 +55,65 @@ class Game:
             print(f'it is P{self.to_move(state) + 1}\'s turn')
 
 
-def minimax_search(game: Game, state: State) -> Action | None:
+def minimax_search(game: Game, state: State, table=None, key=lambda s: s, stats=None) -> Action | None:
+    """Returns the minimax action for the player to move.
+
+    If a transposition.TranspositionTable is given, the values are stored under
+    key(state), so positions that share a key (e.g. symmetric boards) are searched once.
+    If a search_stats.SearchStats is given, every node is reported with its ply.
+    """
     player = game.to_move(state)
 
-    def max_value(s: State) -> float:
+    def cached(s: State) -> float | None:
+        if table is None:
+            return None
+        entry = table.get((player, key(s)))
+        return entry[1] if entry is not None and entry[0] == EXACT else None
+
+    def store(s: State, v: float) -> float:
+        if table is not None:
+            table.put((player, key(s)), (EXACT, v))
+        return v
+
+    def max_value(s: State, ply: int) -> float:
+        if stats is not None:
+            stats.node(ply)
         if game.is_terminal(s):
             return game.utility(s, player)
+        v = cached(s)
+        if v is not None:
+            return v
         v = -math.inf
         for a in game.actions(s):
-            v = max(v, min_value(game.result(s, a)))
-        return v
+            v = max(v, min_value(game.result(s, a), ply + 1))
+        return store(s, v)
 
-    def min_value(s: State) -> float:
+    def min_value(s: State, ply: int) -> float:
+        if stats is not None:
+            stats.node(ply)
         if game.is_terminal(s):
             return game.utility(s, player)
+        v = cached(s)
+        if v is not None:
+            return v
         v = math.inf
         for a in game.actions(s):
-            v = min(v, max_value(game.result(s, a)))
-        return v
+            v = min(v, max_value(game.result(s, a), ply + 1))
+        return store(s, v)
 
+    if stats is not None:
+        stats.node(0)
     best_action = None
     best_value = -math.inf
     for a in game.actions(state):
-        v = min_value(game.result(state, a))
+        v = min_value(game.result(state, a), 1)
         if v > best_value:
             best_value = v
             best_action = a
     return best_action
 
 
-if __name__ == "__main__":
+def main():
     # Run the halving game
     game = Game(5)
     state = game.initial_state()
@@ -94,3 +125,7 @@ if __name__ == "__main__":
         print(f'P{player + 1}\'s action: {action}')
         state = game.result(state, action)
         game.print(state)
+
+
+if __name__ == "__main__":
+    main()
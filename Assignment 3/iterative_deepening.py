@@ -0,0 +1,177 @@
+import math
+import time
+from typing import Any, Callable
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget runs out."""
+
+
+class IterativeDeepeningSearch:
+    def __init__(
+        self,
+        game,
+        evaluate: Callable[[Any, int], float] | None = None,
+        time_limit: float | None = 1.0,
+        max_depth: int | None = None,
+        stats=None,
+    ):
+        """Anytime alpha-beta search that deepens one ply at a time until the time runs out.
+
+        Moves are tried in this order: the principal variation of the previous
+        iteration, the killer moves of the ply, then by history score. The killer and
+        history tables are kept between calls to search(), so keep one instance per
+        player for a whole game.
+
+        Parameters
+        ----------
+        game
+            Any game with to_move, actions, result, is_terminal and utility
+        evaluate : Callable[[Any, int], float] | None
+            evaluate(state, player) estimates the utility of a non-terminal state for
+            player when the depth limit is reached, 0 for every state if None
+        time_limit : float | None
+            Wall-clock seconds per call to search(), None for no limit
+        max_depth : int | None
+            The deepest iteration, None to keep going until the whole tree is searched
+        stats : search_stats.SearchStats | None
+            If given, gets every node and cutoff with its ply, and the end of every
+            completed iteration for the time per depth
+        """
+        self.game = game
+        self.evaluate = evaluate if evaluate is not None else lambda state, player: 0
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.stats = stats
+        # killers[ply] holds the last two moves that caused a cutoff at that ply
+        self.killers: list[list] = []
+        self.history: dict[Any, int] = {}
+        # filled in by search()
+        self.nodes = 0
+        self.depth_reached = 0
+        self.value = None
+        self.principal_variation: list = []
+
+    def order_actions(self, actions: list, ply: int, pv_action) -> list:
+        """Returns the actions with the PV move first, then the killers, then by history score."""
+        killers = self.killers[ply] if ply < len(self.killers) else []
+
+        def priority(a) -> tuple[int, int]:
+            if a == pv_action:
+                return 0, 0
+            if a in killers:
+                return 1, 0
+            return 2, -self.history.get(a, 0)
+
+        # sorted is stable, so equal priorities keep the game's order
+        return sorted(actions, key=priority)
+
+    def search(self, state):
+        """Returns the best action found for the player to move within the time limit."""
+        game = self.game
+        stats = self.stats
+        player = game.to_move(state)
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        self.nodes = 0
+        self.depth_reached = 0
+        self.value = None
+        previous_pv: list = []
+        actions = game.actions(state)
+        best_action = actions[0] if actions else None
+
+        # set to False when some node was cut off by the depth limit instead of being terminal
+        exact = True
+
+        def alphabeta(s, depth: int, alpha: float, beta: float, ply: int, pv: list, on_pv: bool) -> float:
+            """Returns the value of s for player, and fills pv with the best line from s."""
+            nonlocal exact
+            self.nodes += 1
+            if stats is not None:
+                stats.node(ply)
+            if deadline is not None and self.nodes & 255 == 0 and time.perf_counter() > deadline:
+                raise SearchTimeout
+            if game.is_terminal(s):
+                return game.utility(s, player)
+            if depth == 0:
+                exact = False
+                return self.evaluate(s, player)
+
+            while len(self.killers) <= ply:
+                self.killers.append([])
+            pv_action = previous_pv[ply] if on_pv and ply < len(previous_pv) else None
+            maximizing = game.to_move(s) == player
+            v = -math.inf if maximizing else math.inf
+            child_pv: list = []
+            for a in self.order_actions(game.actions(s), ply, pv_action):
+                child_pv.clear()
+                child_value = alphabeta(
+                    game.result(s, a), depth - 1, alpha, beta, ply + 1, child_pv, on_pv and a == pv_action
+                )
+                if maximizing and child_value > v or not maximizing and child_value < v:
+                    v = child_value
+                    pv[:] = [a] + child_pv
+                if maximizing:
+                    alpha = max(alpha, v)
+                else:
+                    beta = min(beta, v)
+                if alpha >= beta:
+                    # the move was good enough to cut off the rest, remember it
+                    killers = self.killers[ply]
+                    if a not in killers:
+                        killers.insert(0, a)
+                        del killers[2:]
+                    self.history[a] = self.history.get(a, 0) + depth * depth
+                    if stats is not None:
+                        stats.prune(ply)
+                    break
+            return v
+
+        depth = 0
+        while actions and (self.max_depth is None or depth < self.max_depth):
+            depth += 1
+            exact = True
+            if stats is not None:
+                stats.node(0)
+            iteration_best = None
+            iteration_value = -math.inf
+            iteration_pv: list = []
+            pv_action = previous_pv[0] if previous_pv else None
+            try:
+                alpha = -math.inf
+                for a in self.order_actions(actions, 0, pv_action):
+                    child_pv: list = []
+                    v = alphabeta(game.result(state, a), depth - 1, alpha, math.inf, 1, child_pv, a == pv_action)
+                    if v > iteration_value:
+                        iteration_value = v
+                        iteration_best = a
+                        iteration_pv = [a] + child_pv
+                    alpha = max(alpha, iteration_value)
+            except SearchTimeout:
+                # the previous best move is searched first, so a different best move means
+                # it beat the previous one at the deeper depth and is safe to play
+                if iteration_best is not None and iteration_best != pv_action:
+                    best_action = iteration_best
+                    self.value = iteration_value
+                break
+            best_action = iteration_best
+            self.value = iteration_value
+            self.depth_reached = depth
+            if stats is not None:
+                stats.iteration(depth)
+            self.principal_variation = previous_pv = iteration_pv
+            if exact:
+                # nothing was cut off by the depth limit, deeper iterations would find the same
+                break
+        return best_action
+
+
+def iterative_deepening_search(
+    game,
+    state,
+    evaluate: Callable[[Any, int], float] | None = None,
+    time_limit: float | None = 1.0,
+    max_depth: int | None = None,
+    stats=None,
+):
+    """Returns the best action found by iterative deepening alpha-beta within time_limit seconds."""
+    return IterativeDeepeningSearch(game, evaluate, time_limit, max_depth, stats).search(state)
@@ -0,0 +1,348 @@
+# Monte Carlo tree search (UCT) for the Game classes of halving_game, bucket_game,
+# tic_tac_toe and mnk_game, for games too big for the full-depth searches.
+# The statistics and links of the tree live in flat arrays indexed by node number (the states
+# and actions in two lists beside them), the children of a node are consecutive, and the tree
+# below the move that was played is kept for the next search.
+#   python mcts.py  # MCTS against alpha-beta on tic-tac-toe, and playouts per second per worker count
+
+import math
+import os
+import random
+import time
+from array import array
+
+
+def playout(game, state, rng: random.Random) -> float:
+    """Plays random moves until the game ends, or reaches a state without actions, and returns P1's utility there."""
+    while not game.is_terminal(state) and (actions := game.actions(state)):
+        state = game.result(state, rng.choice(actions))
+    return game.utility(state, 0)
+
+
+def playouts(game, states: list, seed: int) -> list[float]:
+    """Worker task: one playout from each state."""
+    rng = random.Random(seed)
+    return [playout(game, state, rng) for state in states]
+
+
+class MCTS:
+    def __init__(
+        self,
+        game,
+        iterations: int | None = 1000,
+        time_limit: float | None = None,
+        exploration: float = math.sqrt(2),
+        workers: int = 1,
+        batch_size: int | None = None,
+        seed: int | None = None,
+        stats=None,
+    ):
+        """UCT search that keeps its tree between moves.
+
+        Every node has its visit count, the total reward of the player who moved into it,
+        the player who moved, whether it is terminal and where its children start in flat
+        arrays, so its statistics cost a few machine words instead of an object. Its state
+        and the action leading to it are kept in two lists beside the arrays. The rewards are
+        the games' utilities (zero-sum, P2's is minus P1's), scaled by the largest one seen
+        so the exploration constant works for any range.
+
+        With more than one worker, batch_size leaves are selected before any playout result
+        is known, each selection counting as a visit with no reward on its path at once (a
+        virtual draw, which lowers the mean reward of a winning path until its playout comes
+        back) so the batch spreads over the tree, and the playouts are split over a process pool.
+
+        A state that is not terminal but has no actions ends the game there all the same,
+        it is scored with the game's utility.
+
+        Parameters
+        ----------
+        game
+            Any two-player zero-sum game with to_move, actions, result, is_terminal and
+            utility, picklable if workers > 1
+        iterations : int | None
+            Playouts per call to search(), None for no limit
+        time_limit : float | None
+            Wall-clock seconds per call to search(), None for no limit
+        exploration : float
+            The UCT exploration constant
+        workers : int
+            Playout processes, 1 runs the playouts in this process without a pool
+        batch_size : int | None
+            Leaves selected per round, 4 * workers if None
+        seed : int | None
+            Seed for the playouts, the search is repeatable with a seed and one worker
+        stats : search_stats.SearchStats | None
+            If given, gets a node() with its depth for every selected leaf
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("MCTS needs an iteration or a time budget")
+        self.game = game
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.workers = workers
+        self.batch_size = batch_size or (1 if workers == 1 else 4 * workers)
+        self.rng = random.Random(seed)
+        self.stats = stats
+        self.pool = None
+        if workers > 1:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.pool = ProcessPoolExecutor(workers)
+        self.clear()
+        # filled in by search()
+        self.playouts = 0
+        self.reused = 0
+        self.value = None
+
+    def clear(self):
+        """Drops the tree."""
+        self.visits = array('q')
+        self.reward = array('d')
+        # the player who moved into the node, -1 for the root
+        self.player = array('b')
+        self.terminal = array('b')
+        # first_child[i] is -1 until node i is expanded, its children are the next child_count[i] nodes from there
+        self.first_child = array('q')
+        self.child_count = array('q')
+        self.actions: list = []
+        self.states: list = []
+        # the largest absolute utility seen, rewards are divided by it
+        self.scale = 0.0
+
+    def add_node(self, state, action, player: int) -> int:
+        self.visits.append(0)
+        self.reward.append(0.0)
+        self.player.append(player)
+        self.terminal.append(self.game.is_terminal(state))
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        self.actions.append(action)
+        self.states.append(state)
+        return len(self.visits) - 1
+
+    def expand(self, node: int):
+        game = self.game
+        state = self.states[node]
+        player = game.to_move(state)
+        actions = game.actions(state)
+        if not actions:
+            # nothing to play, so the game ends here
+            self.terminal[node] = True
+            return
+        self.first_child[node] = len(self.visits)
+        self.child_count[node] = len(actions)
+        for action in actions:
+            self.add_node(game.result(state, action), action, player)
+
+    def reroot(self, root: int):
+        """Keeps only the subtree below root, renumbered so that root is node 0."""
+        # breadth first, so the children of every node stay consecutive
+        order = [root]
+        first_child = array('q')
+        for node in order:
+            first = self.first_child[node]
+            if first < 0:
+                first_child.append(-1)
+            else:
+                first_child.append(len(order))
+                order.extend(range(first, first + self.child_count[node]))
+        self.visits = array('q', (self.visits[node] for node in order))
+        self.reward = array('d', (self.reward[node] for node in order))
+        self.player = array('b', (self.player[node] for node in order))
+        self.player[0] = -1
+        self.terminal = array('b', (self.terminal[node] for node in order))
+        self.first_child = first_child
+        self.child_count = array('q', (self.child_count[node] for node in order))
+        self.actions = [self.actions[node] for node in order]
+        self.states = [self.states[node] for node in order]
+
+    def find_root(self, state) -> bool:
+        """Moves the root to state if it is the root or up to two plies below it, returns False otherwise.
+
+        Two plies covers our own move and the opponent's reply since the last search.
+        """
+        if not self.states:
+            return False
+        if self.states[0] == state:
+            return True
+        level = [0]
+        for _ in range(2):
+            children = []
+            for node in level:
+                first = self.first_child[node]
+                if first >= 0:
+                    children.extend(range(first, first + self.child_count[node]))
+            for node in children:
+                if self.states[node] == state:
+                    self.reroot(node)
+                    return True
+            level = children
+        return False
+
+    def select(self) -> tuple[list[int], int]:
+        """Walks down by UCT from the root, expanding the leaf it ends on.
+
+        Returns the path and the depth of the leaf. Every node on the path is visited at
+        once, before its reward is known.
+        """
+        visits, reward, first_child, child_count = self.visits, self.reward, self.first_child, self.child_count
+        scale = self.scale or 1.0
+        node = 0
+        path = [0]
+        visits[0] += 1
+        while not self.terminal[node]:
+            first = first_child[node]
+            if first < 0:
+                self.expand(node)
+                if self.terminal[node]:
+                    break
+                # the arrays grew, but they are the same objects
+                node = first_child[node]
+                visits[node] += 1
+                path.append(node)
+                break
+            log_parent = math.log(visits[node])
+            best, best_score = -1, -math.inf
+            for child in range(first, first + child_count[node]):
+                n = visits[child]
+                if n == 0:
+                    best = child
+                    break
+                score = reward[child] / (n * scale) + self.exploration * math.sqrt(log_parent / n)
+                if score > best_score:
+                    best, best_score = child, score
+            node = best
+            visits[node] += 1
+            path.append(node)
+        return path, len(path) - 1
+
+    def backpropagate(self, path: list[int], utility: float):
+        """Adds P1's utility to every node on the path, from the side of the player who moved into it."""
+        self.scale = max(self.scale, abs(utility))
+        reward, player = self.reward, self.player
+        for node in path[1:]:
+            reward[node] += utility if player[node] == 0 else -utility
+
+    def run_batch(self, size: int):
+        leaves = []
+        for _ in range(size):
+            path, depth = self.select()
+            if self.stats is not None:
+                self.stats.node(depth)
+            leaves.append(path)
+
+        game = self.game
+        results: list[float | None] = [None] * len(leaves)
+        pending = []
+        for i, path in enumerate(leaves):
+            leaf = path[-1]
+            if self.terminal[leaf]:
+                results[i] = game.utility(self.states[leaf], 0)
+            else:
+                pending.append(i)
+        if self.pool is None:
+            for i in pending:
+                results[i] = playout(game, self.states[leaves[i][-1]], self.rng)
+        elif pending:
+            # one task per worker, each with its own seed
+            chunks = [pending[w::self.workers] for w in range(self.workers)]
+            futures = [
+                self.pool.submit(playouts, game, [self.states[leaves[i][-1]] for i in chunk], self.rng.getrandbits(64))
+                for chunk in chunks
+                if chunk
+            ]
+            for chunk, future in zip((chunk for chunk in chunks if chunk), futures):
+                for i, utility in zip(chunk, future.result()):
+                    results[i] = utility
+        for path, utility in zip(leaves, results):
+            self.backpropagate(path, utility)
+        self.playouts += len(leaves)
+
+    def search(self, state, iterations: int | None = None, time_limit: float | None = None):
+        """Returns the most visited action for the player to move, None in a terminal state or one without actions.
+
+        The tree of the previous search is reused if state is in it. iterations and
+        time_limit override the budget given to the constructor for this call.
+        """
+        game = self.game
+        self.playouts = 0
+        self.value = None
+        if game.is_terminal(state) or not game.actions(state):
+            return None
+        if self.find_root(state):
+            self.reused = len(self.visits)
+        else:
+            self.clear()
+            self.add_node(state, None, -1)
+            self.reused = 0
+        iterations = iterations if iterations is not None else self.iterations
+        time_limit = time_limit if time_limit is not None else self.time_limit
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+
+        while iterations is None or self.playouts < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            size = self.batch_size if iterations is None else min(self.batch_size, iterations - self.playouts)
+            self.run_batch(size)
+
+        first = self.first_child[0]
+        if first < 0:
+            # no playout fitted in the time, any action is as good as another
+            return game.actions(state)[0]
+        best = max(range(first, first + self.child_count[0]), key=self.visits.__getitem__)
+        if self.visits[best]:
+            self.value = self.reward[best] / self.visits[best]
+        return self.actions[best]
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def __enter__(self) -> "MCTS":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def mcts_search(game, state, iterations: int | None = 1000, time_limit: float | None = None, workers: int = 1):
+    """Returns the action MCTS picks for the player to move, searched with a new tree."""
+    with MCTS(game, iterations, time_limit, workers=workers) as search:
+        return search.search(state)
+
+
+if __name__ == "__main__":
+    import tic_tac_toe
+    from mnk_game import MNKGame
+
+    # tic-tac-toe is a draw, so MCTS should never lose to alpha-beta from either side
+    game = tic_tac_toe.Game()
+    for mcts_player in (0, 1):
+        with MCTS(game, iterations=2000, seed=mcts_player) as search:
+            state = game.initial_state()
+            reused = []
+            while not game.is_terminal(state):
+                if game.to_move(state) == mcts_player:
+                    action = search.search(state)
+                    reused.append(search.reused)
+                else:
+                    action = tic_tac_toe.alphabeta_search(game, state)
+                state = game.result(state, action)
+        print(
+            f"MCTS as P{mcts_player + 1} against alpha-beta: utility {game.utility(state, mcts_player)},"
+            f" nodes kept from the last move {reused}"
+        )
+
+    game = MNKGame(7, 7, 4)
+    state = game.initial_state()
+    cpus = os.cpu_count() or 1
+    print("\n=== 7x7, 4 in a row, 2 s per search ===")
+    print(f"{'workers':>7} {'playouts':>9} {'per second':>11} {'action':>8}")
+    for workers in sorted({1, cpus} | {n for n in (2, 4) if n <= cpus}):
+        with MCTS(game, iterations=None, time_limit=2.0, workers=workers, seed=0) as search:
+            if search.pool is not None:
+                # the pool starts its processes lazily, do not time that
+                search.pool.submit(int).result()
+            action = search.search(state)
+        print(f"{workers:>7} {search.playouts:>9} {search.playouts / 2.0:>11.0f} {str(action):>8}")
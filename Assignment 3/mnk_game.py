@@ -0,0 +1,160 @@
+# m,n,k-games: k in a row on an m x n board, tic-tac-toe is MNKGame(3, 3, 3).
+# States are (player, P1's bits, P2's bits) with cell (row, col) at bit n * row + col,
+# the same layout as bitboard_tic_tac_toe, so its states work here as well.
+
+from bitboard_tic_tac_toe import NestedState, from_nested
+
+State = tuple[int, int, int]  # (player to move, P1's bits, P2's bits)
+Action = tuple[int, int]  # (row, col)
+
+
+class MNKGame:
+    def __init__(self, m: int = 3, n: int = 3, k: int = 3):
+        """k in a row on a board with m rows and n columns.
+
+        The board's symmetries (8 for a square board, 4 otherwise) are precomputed as
+        byte lookup tables, so canonical() maps all equivalent positions to one key
+        with a handful of list lookups.
+        """
+        if k > max(m, n):
+            raise ValueError(f"k={k} does not fit on a {m}x{n} board")
+        self.m, self.n, self.k = m, n, k
+        self.cells = m * n
+        self.full = (1 << self.cells) - 1
+
+        # every line of k cells, as a bit mask
+        self.lines: list[int] = []
+        for row in range(m):
+            for col in range(n):
+                for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    end_row, end_col = row + d_row * (k - 1), col + d_col * (k - 1)
+                    if 0 <= end_row < m and 0 <= end_col < n:
+                        self.lines.append(sum(1 << (n * (row + d_row * i) + col + d_col * i) for i in range(k)))
+
+        # each symmetry maps (row, col) to a new cell
+        maps = [
+            lambda r, c: (r, c),
+            lambda r, c: (m - 1 - r, c),
+            lambda r, c: (r, n - 1 - c),
+            lambda r, c: (m - 1 - r, n - 1 - c),
+        ]
+        if m == n:
+            maps += [
+                lambda r, c: (c, r),
+                lambda r, c: (c, n - 1 - r),
+                lambda r, c: (n - 1 - c, r),
+                lambda r, c: (n - 1 - c, n - 1 - r),
+            ]
+        permutations = [[n * row + col for row, col in (f(cell // n, cell % n) for cell in range(self.cells))] for f in maps]
+        # byte_tables[s][chunk][byte] is where the 8 cells of that chunk go under symmetry s
+        self.byte_tables = [
+            [
+                [
+                    sum(1 << permutation[8 * chunk + i] for i in range(8) if byte >> i & 1 and 8 * chunk + i < self.cells)
+                    for byte in range(256)
+                ]
+                for chunk in range((self.cells + 7) // 8)
+            ]
+            for permutation in permutations
+        ]
+
+    def initial_state(self) -> State:
+        return 0, 0, 0
+
+    def to_move(self, state: State) -> int:
+        return state[0]
+
+    def actions(self, state: State) -> list[Action]:
+        _, x_bits, o_bits = state
+        occupied = x_bits | o_bits
+        return [divmod(cell, self.n) for cell in range(self.cells) if not occupied >> cell & 1]
+
+    def result(self, state: State, action: Action) -> State:
+        player, x_bits, o_bits = state
+        bit = 1 << (self.n * action[0] + action[1])
+        if player == 0:
+            return 1, x_bits | bit, o_bits
+        return 0, x_bits, o_bits | bit
+
+    def is_winner(self, state: State, player: int) -> bool:
+        bits = state[1 + player]
+        return any(bits & line == line for line in self.lines)
+
+    def is_terminal(self, state: State) -> bool:
+        _, x_bits, o_bits = state
+        # only the player who just moved can have completed a line
+        return self.is_winner(state, 1 - state[0]) or x_bits | o_bits == self.full
+
+    def utility(self, state: State, player: int) -> float:
+        assert self.is_terminal(state)
+        if self.is_winner(state, player):
+            return 1
+        if self.is_winner(state, 1 - player):
+            return -1
+        return 0
+
+    def evaluate(self, state: State, player: int) -> float:
+        """Estimates a non-terminal state for the depth limited searches.
+
+        Counts the lines that only player has pieces on minus the lines only the
+        opponent has pieces on, scaled to stay strictly between -1 and 1.
+        """
+        mine, theirs = state[1 + player], state[2 - player]
+        score = 0
+        for line in self.lines:
+            if line & mine and not line & theirs:
+                score += 1
+            elif line & theirs and not line & mine:
+                score -= 1
+        return score / (len(self.lines) + 1)
+
+    def transform(self, bits: int, symmetry: int) -> int:
+        """Returns bits with every cell moved by the given symmetry."""
+        result = 0
+        for table in self.byte_tables[symmetry]:
+            result |= table[bits & 255]
+            bits >>= 8
+        return result
+
+    def canonical(self, state: State) -> State:
+        """Returns the smallest of the equivalent states under the board's symmetries."""
+        player, x_bits, o_bits = state
+        return player, *min(
+            (self.transform(x_bits, symmetry), self.transform(o_bits, symmetry))
+            for symmetry in range(len(self.byte_tables))
+        )
+
+    def print(self, state: State):
+        _, x_bits, o_bits = state
+        print()
+        for row in range(self.m):
+            cells = [
+                'x' if x_bits >> (self.n * row + col) & 1 else 'o' if o_bits >> (self.n * row + col) & 1 else ' '
+                for col in range(self.n)
+            ]
+            print(' ' + ' | '.join(cells))
+            if row < self.m - 1:
+                print('+'.join(['---'] * self.n))
+        print()
+        if self.is_terminal(state):
+            if self.utility(state, 0) > 0:
+                print('P1 won')
+            elif self.utility(state, 1) > 0:
+                print('P2 won')
+            else:
+                print('The game is a draw')
+        else:
+            print(f'It is P{self.to_move(state)+1}\'s turn to move')
+
+
+# built by the first tic_tac_toe_key() call, the symmetry tables are not needed to import the module
+TIC_TAC_TOE: MNKGame | None = None
+
+
+def tic_tac_toe_key(state: NestedState) -> State:
+    """The canonical key of a tic_tac_toe.Game state, for sharing a table between equivalent boards."""
+    global TIC_TAC_TOE
+    if TIC_TAC_TOE is None:
+        TIC_TAC_TOE = MNKGame(3, 3, 3)
+    return TIC_TAC_TOE.canonical(from_nested(state))
+
@@ -0,0 +1,229 @@
+# Alpha-beta split over a process pool at the root, Young Brothers Wait style:
+# the first root move is searched alone to get a bound, then the other moves are
+# searched in parallel, all workers reading and raising one shared alpha.
+#   python parallel_search.py        # speedup against the number of workers, up to os.cpu_count()
+#   python parallel_search.py 1 2 4  # for these worker counts
+
+import math
+import os
+import time
+
+# the shared alpha of the search running in this worker, set by init_worker()
+shared_alpha = None
+
+
+def init_worker(alpha):
+    global shared_alpha
+    shared_alpha = alpha
+
+
+def alphabeta_value(game, state, player: int, alpha: float, beta: float, shared=None) -> tuple[float, float, int]:
+    """Returns (value, alpha, nodes) for state from player's side.
+
+    The value is exact if it is above the returned alpha, otherwise it is only an
+    upper bound. If shared is a multiprocessing.Value with the best root value found
+    so far, it is read every 256 nodes and used as alpha everywhere in the tree, which
+    is sound because alpha is always the root player's guaranteed value here.
+    """
+    root_alpha = [alpha]
+    nodes = 0
+
+    def refresh():
+        nonlocal nodes
+        nodes += 1
+        if shared is not None and nodes & 255 == 0 and shared.value > root_alpha[0]:
+            root_alpha[0] = shared.value
+
+    def max_value(s, alpha: float, beta: float) -> float:
+        refresh()
+        if game.is_terminal(s):
+            return game.utility(s, player)
+        alpha = max(alpha, root_alpha[0])
+        v = -math.inf
+        for a in game.actions(s):
+            v = max(v, min_value(game.result(s, a), alpha, beta))
+            if v >= beta:
+                return v  # β cutoff
+            alpha = max(alpha, v, root_alpha[0])
+        return v
+
+    def min_value(s, alpha: float, beta: float) -> float:
+        refresh()
+        if game.is_terminal(s):
+            return game.utility(s, player)
+        v = math.inf
+        for a in game.actions(s):
+            v = min(v, max_value(game.result(s, a), alpha, beta))
+            alpha = max(alpha, root_alpha[0])
+            if v <= alpha:
+                return v  # α cutoff
+            beta = min(beta, v)
+        return v
+
+    search = max_value if game.to_move(state) == player else min_value
+    v = search(state, alpha, beta)
+    return v, root_alpha[0], nodes
+
+
+def search_root_move(game, state, action, alpha: float) -> tuple[float, float, int]:
+    """Worker task: searches one root move, then raises the shared alpha if its value is exact."""
+    player = game.to_move(state)
+    alpha = max(alpha, shared_alpha.value)
+    v, alpha, nodes = alphabeta_value(game, game.result(state, action), player, alpha, math.inf, shared_alpha)
+    if v > alpha:
+        with shared_alpha.get_lock():
+            if v > shared_alpha.value:
+                shared_alpha.value = v
+    return v, alpha, nodes
+
+
+class ParallelAlphaBeta:
+    def __init__(self, game, workers: int | None = None):
+        """Alpha-beta over a process pool that returns the same action as the serial searches.
+
+        The pool is started once and reused by every call to search(), use it as a
+        context manager or call close(). The game and its states must be picklable,
+        which holds for the Game classes of halving_game, bucket_game and tic_tac_toe.
+
+        Parameters
+        ----------
+        game
+            Any two-player zero-sum game with to_move, actions, result, is_terminal and utility
+        workers : int | None
+            The number of worker processes, os.cpu_count() if None
+        """
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.game = game
+        self.workers = workers or os.cpu_count() or 1
+        self.alpha = multiprocessing.Value('d', -math.inf)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=(self.alpha,))
+        # filled in by search()
+        self.nodes = 0
+        self.value = None
+        self.researches = 0
+
+    def search(self, state):
+        """Returns the first best action for the player to move, None in a terminal state.
+
+        How far each worker gets before it sees a better alpha depends on timing, so a
+        move can come back with only an upper bound equal to the best value. Those moves
+        are searched again with a null window when they come before the best move, so
+        ties are always broken by the game's action order, like minimax_search does.
+        """
+        from concurrent.futures import FIRST_COMPLETED, wait
+
+        game = self.game
+        self.nodes = 0
+        self.value = None
+        self.researches = 0
+        if game.is_terminal(state):
+            return None
+        player = game.to_move(state)
+        actions = game.actions(state)
+        if not actions:
+            # no legal move, like the serial searches
+            return None
+
+        # the eldest brother is searched first, alone, for a starting alpha
+        v, _, nodes = alphabeta_value(game, game.result(state, actions[0]), player, -math.inf, math.inf)
+        self.nodes += nodes
+        self.alpha.value = v
+        # results[i] is (value, alpha it was searched with, exact)
+        results = [(v, -math.inf, True)] + [None] * (len(actions) - 1)
+
+        pending = {}
+        for i in range(1, len(actions)):
+            future = self.pool.submit(search_root_move, game, state, actions[i], self.alpha.value)
+            pending[future] = i
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                v, alpha, nodes = future.result()
+                self.nodes += nodes
+                results[pending.pop(future)] = (v, alpha, v > alpha)
+
+        best_value = max(v for v, _, exact in results if exact)
+        for i, (v, alpha, exact) in enumerate(results):
+            if exact:
+                if v == best_value:
+                    break
+                continue
+            if alpha < best_value:
+                # v <= alpha < best_value, so this move is worse
+                continue
+            # v is an upper bound, is the move as good as the best one?
+            self.researches += 1
+            v, _, nodes = alphabeta_value(game, game.result(state, actions[i]), player, -math.inf, best_value)
+            self.nodes += nodes
+            if v >= best_value:
+                break
+        self.value = best_value
+        return actions[i]
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self) -> "ParallelAlphaBeta":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def parallel_alphabeta_search(game, state, workers: int | None = None):
+    """Returns the first best action for the player to move, searched on a new process pool."""
+    with ParallelAlphaBeta(game, workers) as search:
+        return search.search(state)
+
+
+def serial_alphabeta_search(game, state):
+    """The same root loop on one core, the baseline for the speedup."""
+    player = game.to_move(state)
+    best_action, best_value = None, -math.inf
+    for a in game.actions(state):
+        v, _, _ = alphabeta_value(game, game.result(state, a), player, best_value, math.inf)
+        if v > best_value:
+            best_action, best_value = a, v
+    return best_action
+
+
+if __name__ == "__main__":
+    import sys
+
+    import halving_game
+    import tic_tac_toe
+
+    benchmarks = [
+        ("tic-tac-toe", tic_tac_toe.Game(), tic_tac_toe.alphabeta_search),
+        ("halving N=100", halving_game.Game(100), halving_game.minimax_search),
+    ]
+    cpus = os.cpu_count() or 1
+    if sys.argv[1:]:
+        worker_counts = sorted({int(arg) for arg in sys.argv[1:]})
+    else:
+        worker_counts = sorted({1, cpus} | {n for n in (2, 4, 8) if n <= cpus})
+    if cpus == 1:
+        print("Only one CPU here, so the speedup over more workers is not demonstrated"
+              " (more workers than CPUs only share the one core)")
+    for name, game, reference_search in benchmarks:
+        state = game.initial_state()
+        expected = reference_search(game, state)
+        t0 = time.perf_counter()
+        assert serial_alphabeta_search(game, state) == expected
+        serial_time = time.perf_counter() - t0
+        print(f"\n=== {name}: {expected} by {reference_search.__name__}, serial alpha-beta {serial_time:.3f} s ===")
+        print(f"{'workers':>7} {'action':>10} {'time (s)':>9} {'speedup':>8} {'nodes':>9} {'re-searches':>11}")
+        for workers in worker_counts:
+            with ParallelAlphaBeta(game, workers) as search:
+                # the pool starts its processes lazily, do not time that
+                search.pool.submit(int).result()
+                t0 = time.perf_counter()
+                action = search.search(state)
+                elapsed = time.perf_counter() - t0
+            assert action == expected, (action, expected)
+            print(
+                f"{workers:>7} {str(action):>10} {elapsed:>9.3f} {serial_time / elapsed:>7.2f}x"
+                f" {search.nodes:>9} {search.researches:>11}"
+            )
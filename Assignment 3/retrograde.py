@@ -0,0 +1,170 @@
+# Retrograde solver: labels every reachable state of a small two-player zero-sum game
+# with its minimax value and best action once, then answers queries by table lookup.
+#
+# The table is stored as an open addressing hash table in a single file:
+#   header  magic, version, capacity, count  (4s I Q Q)
+#   keys    capacity x uint64, encode(state), EMPTY for a free slot
+#   values  capacity x float32, the value of the state for P1
+#   actions capacity x uint16, index into game.actions(state) of the best action, NO_ACTION if terminal
+# GameTable.load() memory-maps the file, so nothing is read until a lookup touches it.
+
+import math
+import mmap
+import struct
+from array import array
+from typing import Any, Callable
+
+MAGIC = b"GTBL"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQ")
+EMPTY = (1 << 64) - 1
+NO_ACTION = (1 << 16) - 1
+
+
+def slot(key: int, capacity: int) -> int:
+    # Fibonacci hashing, capacity is a power of two
+    return (key * 0x9E3779B97F4A7C15 & EMPTY) >> (64 - capacity.bit_length() + 1)
+
+
+class GameTable:
+    def __init__(self, game, encode: Callable[[Any], int], keys, values, actions, file=None):
+        """Minimax values and best actions for every state reachable in a game.
+
+        Build one with solve() or GameTable.load(), not directly.
+
+        Parameters
+        ----------
+        game
+            The game the table was solved for
+        encode : Callable[[Any], int]
+            Maps a state to a unique int below 2**64 - 1, the same function used by solve()
+        """
+        self.game = game
+        self.encode = encode
+        self.keys = keys
+        self.values = values
+        self.actions = actions
+        self.capacity = len(keys)
+        self.file = file
+
+    def find(self, state) -> int:
+        """Returns the slot of state in the table, -1 if it was not reachable when solving."""
+        key = self.encode(state)
+        keys = self.keys
+        mask = self.capacity - 1
+        i = slot(key, self.capacity)
+        while True:
+            found = keys[i]
+            if found == key:
+                return i
+            if found == EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def value(self, state, player: int = 0) -> float:
+        """Returns the minimax value of state for player."""
+        i = self.find(state)
+        if i < 0:
+            raise KeyError(f"{state} is not in the table")
+        return self.values[i] if player == 0 else -self.values[i]
+
+    def best_action(self, state):
+        """Returns the minimax action for the player to move, None in a terminal state."""
+        i = self.find(state)
+        if i < 0:
+            raise KeyError(f"{state} is not in the table")
+        index = self.actions[i]
+        return None if index == NO_ACTION else self.game.actions(state)[index]
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.keys if key != EMPTY)
+
+    def save(self, path: str):
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.capacity, len(self)))
+            for part in (self.keys, self.values, self.actions):
+                file.write(part.tobytes() if isinstance(part, array) else bytes(part))
+
+    @classmethod
+    def load(cls, path: str, game, encode: Callable[[Any], int]) -> "GameTable":
+        """Memory-maps a table written by save()."""
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, capacity, _ = HEADER.unpack_from(mapped)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} game table")
+        view = memoryview(mapped)
+        start = HEADER.size
+        keys = view[start:start + 8 * capacity].cast("Q")
+        start += 8 * capacity
+        values = view[start:start + 4 * capacity].cast("f")
+        start += 4 * capacity
+        actions = view[start:start + 2 * capacity].cast("H")
+        return cls(game, encode, keys, values, actions, file=mapped)
+
+    def close(self):
+        """Releases the memory map of a loaded table."""
+        if self.file is not None:
+            for part in (self.keys, self.values, self.actions):
+                part.release()
+            self.file.close()
+            self.file = None
+
+
+def solve(game, encode: Callable[[Any], int], state=None) -> GameTable:
+    """Enumerates every state reachable from state (the initial state if None) and
+    labels each with its value for P1 and the first best action for the player to move.
+
+    The game must be two-player and zero-sum (utility(s, 1) == -utility(s, 0)), with
+    players 0 and 1 and at most 65535 actions per state. States are visited with an
+    explicit stack, children before parents, so deep games do not hit the recursion limit.
+    """
+    if state is None:
+        state = game.initial_state()
+    # encode(state) -> (value for P1, best action index)
+    solved: dict[int, tuple[float, int]] = {}
+
+    def value_of(s, key: int) -> float | None:
+        if key in solved:
+            return solved[key][0]
+        if game.is_terminal(s):
+            solved[key] = (game.utility(s, 0), NO_ACTION)
+            return solved[key][0]
+        return None
+
+    if value_of(state, encode(state)) is None:
+        # every frame is [state, key, its actions, keys of the children solved so far]
+        stack = [[state, encode(state), game.actions(state), []]]
+        while stack:
+            s, key, actions, child_keys = stack[-1]
+            # push the first unsolved child, or solve s once all children are solved
+            while len(child_keys) < len(actions):
+                child = game.result(s, actions[len(child_keys)])
+                child_key = encode(child)
+                if value_of(child, child_key) is None:
+                    break
+                child_keys.append(child_key)
+            if len(child_keys) < len(actions):
+                stack.append([child, child_key, game.actions(child), []])
+                continue
+            stack.pop()
+            sign = 1 if game.to_move(s) == 0 else -1
+            best_value, best_index = -math.inf, NO_ACTION
+            for index, child_key in enumerate(child_keys):
+                v = sign * solved[child_key][0]
+                if v > best_value:
+                    best_value, best_index = v, index
+            solved[key] = (sign * best_value, best_index)
+
+    capacity = 1 << max(4, (2 * len(solved) - 1).bit_length())
+    keys = array("Q", [EMPTY]) * capacity
+    values = array("f", [0.0]) * capacity
+    actions = array("H", [NO_ACTION]) * capacity
+    for key, (value, index) in solved.items():
+        if key >= EMPTY:
+            raise ValueError(f"encode() returned {key}, which does not fit below 2**64 - 1")
+        i = slot(key, capacity)
+        while keys[i] != EMPTY:
+            i = (i + 1) & (capacity - 1)
+        keys[i], values[i], actions[i] = key, value, index
+    return GameTable(game, encode, keys, values, actions)
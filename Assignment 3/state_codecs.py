@@ -0,0 +1,96 @@
+# Packed game states: every state of halving_game, bucket_game, tic_tac_toe and mnk_game as one int.
+# Ints are immutable and hashable, so a packed state is a transposition table or cache key as it
+# is, and takes 28-32 bytes instead of a tuple of lists. Every codec has encode(state) -> int and
+# decode(key) -> state, so encode is the key function of the searches' transposition tables, e.g.
+#   alphabeta_search(tic_tac_toe.Game(), state, table=TranspositionTable(), key=TicTacToeCodec().encode)
+# and PackedGame plays a game's rules on the packed states. For tic-tac-toe the rules on
+# hashable states are bitboard_tic_tac_toe.BitboardGame.
+
+from bitboard_tic_tac_toe import FULL, from_nested, to_nested
+
+
+class HalvingCodec:
+    """halving_game states (player, number) as number << 1 | player."""
+
+    def encode(self, state: tuple[int, int]) -> int:
+        player, number = state
+        return number << 1 | player
+
+    def decode(self, key: int) -> tuple[int, int]:
+        return key & 1, key >> 1
+
+
+class BucketCodec:
+    """bucket_game states (player, buckets or numbers) as the index of the list << 1 | player."""
+
+    # every list the bucket game can show, in the order it shows them
+    LISTS = (('A', 'B', 'C'), (-50, 50), (3, 1), (-5, 15), (-50,), (50,), (3,), (1,), (-5,), (15,))
+
+    def __init__(self):
+        self.index = {items: i for i, items in enumerate(self.LISTS)}
+
+    def encode(self, state: tuple[int, list]) -> int:
+        player, items = state
+        return self.index[tuple(items)] << 1 | player
+
+    def decode(self, key: int) -> tuple[int, list]:
+        return key & 1, list(self.LISTS[key >> 1])
+
+
+class TicTacToeCodec:
+    """tic_tac_toe states as P1's 9 cells in bits 0-8, P2's in bits 9-17 and the player in bit 18."""
+
+    def encode(self, state: tuple[int, list[list[int | None]]]) -> int:
+        player, x_bits, o_bits = from_nested(state)
+        return player << 18 | o_bits << 9 | x_bits
+
+    def decode(self, key: int) -> tuple[int, list[list[int | None]]]:
+        return to_nested((key >> 18, key & FULL, key >> 9 & FULL))
+
+
+class MNKCodec:
+    def __init__(self, game):
+        """mnk_game states (player, P1's bits, P2's bits) packed the same way as TicTacToeCodec."""
+        self.cells = game.cells
+        self.full = game.full
+
+    def encode(self, state: tuple[int, int, int]) -> int:
+        player, x_bits, o_bits = state
+        return (player << self.cells | o_bits) << self.cells | x_bits
+
+    def decode(self, key: int) -> tuple[int, int, int]:
+        return key >> 2 * self.cells, key & self.full, key >> self.cells & self.full
+
+
+class PackedGame:
+    def __init__(self, game, codec):
+        """The rules of game on the states packed by codec.
+
+        Every call decodes the state, so this is the general way to run any search on packed
+        states and share tables between them, not the fastest. A search that only needs
+        the table keys packed is faster with the codec's encode as its key function.
+        """
+        self.game = game
+        self.codec = codec
+
+    def initial_state(self) -> int:
+        return self.codec.encode(self.game.initial_state())
+
+    def to_move(self, key: int) -> int:
+        return self.game.to_move(self.codec.decode(key))
+
+    def actions(self, key: int) -> list:
+        return self.game.actions(self.codec.decode(key))
+
+    def result(self, key: int, action) -> int:
+        return self.codec.encode(self.game.result(self.codec.decode(key), action))
+
+    def is_terminal(self, key: int) -> bool:
+        return self.game.is_terminal(self.codec.decode(key))
+
+    def utility(self, key: int, player: int) -> float:
+        return self.game.utility(self.codec.decode(key), player)
+
+    def print(self, key: int):
+        self.game.print(self.codec.decode(key))
+
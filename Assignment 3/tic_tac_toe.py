@@ -1,39 +1,81 @@
 from copy import deepcopy
 import math
-from halving_game import minimax_search
-import time
 
-def alphabeta_search(game, state):
-    """Return the best action using alpha–beta pruning."""
+from transposition import EXACT, LOWER, UPPER
+
+def alphabeta_search(game, state, table=None, key=lambda s: s, stats=None):
+    """Return the best action using alpha–beta pruning.
+
+    If a transposition.TranspositionTable is given, every value is stored under key(state)
+    together with whether it is exact or only a bound, so positions that share a key
+    (e.g. symmetric boards with mnk_game.tic_tac_toe_key) are searched once.
+    If a search_stats.SearchStats is given, every node and every cutoff is reported with its ply.
+    """
     player = game.to_move(state)
 
-    def max_value(s, alpha, beta):
+    def cached(s, alpha, beta):
+        if table is None:
+            return None
+        entry = table.get((player, key(s)))
+        if entry is None:
+            return None
+        flag, v = entry
+        if flag == EXACT or flag == LOWER and v >= beta or flag == UPPER and v <= alpha:
+            return v
+        return None
+
+    def store(s, v, alpha, beta):
+        # alpha and beta are the window the node was searched with
+        if table is not None:
+            flag = UPPER if v <= alpha else LOWER if v >= beta else EXACT
+            table.put((player, key(s)), (flag, v))
+        return v
+
+    def max_value(s, alpha, beta, ply):
+        if stats is not None:
+            stats.node(ply)
         if game.is_terminal(s):
             return game.utility(s, player)
+        v = cached(s, alpha, beta)
+        if v is not None:
+            return v
+        window = alpha, beta
         v = -math.inf
         for a in game.actions(s):
-            v = max(v, min_value(game.result(s, a), alpha, beta))
+            v = max(v, min_value(game.result(s, a), alpha, beta, ply + 1))
             if v >= beta:
-                return v  # β cutoff
+                if stats is not None:
+                    stats.prune(ply)
+                return store(s, v, *window)  # β cutoff
             alpha = max(alpha, v)
-        return v
+        return store(s, v, *window)
 
-    def min_value(s, alpha, beta):
+    def min_value(s, alpha, beta, ply):
+        if stats is not None:
+            stats.node(ply)
         if game.is_terminal(s):
             return game.utility(s, player)
+        v = cached(s, alpha, beta)
+        if v is not None:
+            return v
+        window = alpha, beta
         v = math.inf
         for a in game.actions(s):
-            v = min(v, max_value(game.result(s, a), alpha, beta))
+            v = min(v, max_value(game.result(s, a), alpha, beta, ply + 1))
             if v <= alpha:
-                return v  # α cutoff
+                if stats is not None:
+                    stats.prune(ply)
+                return store(s, v, *window)  # α cutoff
             beta = min(beta, v)
-        return v
+        return store(s, v, *window)
 
+    if stats is not None:
+        stats.node(0)
     best_score = -math.inf
     best_action = None
     alpha, beta = -math.inf, math.inf
     for a in game.actions(state):
-        v = min_value(game.result(state, a), alpha, beta)
+        v = min_value(game.result(state, a), alpha, beta, 1)
         if v > best_score:
             best_score = v
             best_action = a
@@ -118,26 +160,88 @@ class Game:
         else:
             print(f'It is P{self.to_move(state)+1}\'s turn to move')
 
-game = Game()
-state = game.initial_state()
-
-
-print("\n=== Tic-tac-toe first move timing comparison ===")
-t0 = time.perf_counter()
-first_move_minimax = minimax_search(game, state)
-t1 = time.perf_counter()
-
-t2 = time.perf_counter()
-first_move_alphabeta = alphabeta_search(game, state)
-t3 = time.perf_counter()
-
-print(f"Minimax first move: {first_move_minimax}, time = {t1 - t0:.6f} seconds")
-print(f"Alpha-Beta first move: {first_move_alphabeta}, time = {t3 - t2:.6f} seconds")
-print()
-
-while not game.is_terminal(state):
-    player = game.to_move(state)
-    action = alphabeta_search(game, state)
-    print(f'P{player + 1} plays {action}')
-    state = game.result(state, action)
-    game.print(state)
+def main():
+    """Times the searches on the first move, then plays a game with alpha-beta for both players."""
+    import argparse
+    import os
+    import sys
+    import time
+
+    from halving_game import minimax_search
+    from mnk_game import tic_tac_toe_key
+    from state_codecs import TicTacToeCodec
+    from transposition import TranspositionTable
+
+    parser = argparse.ArgumentParser(description="Times the searches on tic-tac-toe and plays a game with alpha-beta.")
+    parser.add_argument("--cache", help="persistent cache file for the moves of the game, reused across runs")
+    args = parser.parse_args()
+
+    game = Game()
+    state = game.initial_state()
+
+
+    print("\n=== Tic-tac-toe first move timing comparison ===")
+    t0 = time.perf_counter()
+    first_move_minimax = minimax_search(game, state)
+    t1 = time.perf_counter()
+
+    t2 = time.perf_counter()
+    first_move_alphabeta = alphabeta_search(game, state)
+    t3 = time.perf_counter()
+
+    print(f"Minimax first move: {first_move_minimax}, time = {t1 - t0:.6f} seconds")
+    print(f"Alpha-Beta first move: {first_move_alphabeta}, time = {t3 - t2:.6f} seconds")
+
+    # one table for both searches, keyed by the board's canonical form under rotations and reflections
+    table = TranspositionTable()
+    t4 = time.perf_counter()
+    first_move_minimax = minimax_search(game, state, table, tic_tac_toe_key)
+    t5 = time.perf_counter()
+    first_move_alphabeta = alphabeta_search(game, state, table, tic_tac_toe_key)
+    t6 = time.perf_counter()
+    print(f"Minimax first move with symmetry table: {first_move_minimax}, time = {t5 - t4:.6f} seconds")
+    print(f"Alpha-Beta first move with the same table: {first_move_alphabeta}, time = {t6 - t5:.6f} seconds")
+    print(f"Table: {table.stats()}")
+
+    # the same with the exact positions packed into ints, the key is cheaper but symmetric boards are stored apart
+    codec = TicTacToeCodec()
+    table = TranspositionTable()
+    t7 = time.perf_counter()
+    first_move_minimax = minimax_search(game, state, table, codec.encode)
+    t8 = time.perf_counter()
+    first_move_alphabeta = alphabeta_search(game, state, table, codec.encode)
+    t9 = time.perf_counter()
+    print(f"Minimax first move with packed-state table: {first_move_minimax}, time = {t8 - t7:.6f} seconds")
+    print(f"Alpha-Beta first move with the same table: {first_move_alphabeta}, time = {t9 - t8:.6f} seconds")
+    print(f"Table: {table.stats()}")
+    print()
+
+    cache = None
+    if args.cache:
+        # persistent_cache.py is shared with Assignment 2 and lives in the repository root
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from persistent_cache import PersistentCache
+
+        cache = PersistentCache(args.cache)
+
+    t0 = time.perf_counter()
+    while not game.is_terminal(state):
+        player = game.to_move(state)
+        if cache is None:
+            action = alphabeta_search(game, state)
+        else:
+            # keyed by the exact position, a symmetric one would need the move transformed back
+            action = cache.get_or_compute(
+                f"tic-tac-toe/alphabeta/{codec.encode(state)}", lambda: alphabeta_search(game, state)
+            )
+        print(f'P{player + 1} plays {action}')
+        state = game.result(state, action)
+        game.print(state)
+    print(f"Game played in {time.perf_counter() - t0:.4f} seconds")
+    if cache is not None:
+        print(f"Cache: {cache.stats()}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import math
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+# table entries are (flag, value), where value is exact or only a bound found by alpha-beta
+EXACT = 0
+LOWER = 1  # the true value is >= value
+UPPER = 2  # the true value is <= value
+
+
+class TranspositionTable:
+    def __init__(self, max_size: int | None = 1 << 22):
+        """A bounded cache of search results keyed by hashable states.
+
+        When the table is full the least recently used entry is evicted.
+
+        Parameters
+        ----------
+        max_size : int | None
+            The largest number of entries kept, None for no limit
+        """
+        self.max_size = max_size
+        self.entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Returns the value stored for key, or None if there is none."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.max_size is not None and len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def minimax_value(
+    game,
+    state,
+    player: int,
+    table: TranspositionTable | None = None,
+    key: Callable[[Any], Hashable] = lambda state: state,
+    stats=None,
+    ply: int = 0,
+) -> float:
+    """Returns the minimax value of state for player, looking every state up in the table first.
+
+    The search keeps its own stack instead of recursing, so the depth of the game is
+    not limited by Python's recursion limit, and every distinct state is expanded once
+    as long as the table is big enough to hold them all.
+
+    Parameters
+    ----------
+    game
+        Any game with to_move, actions, result, is_terminal and utility
+    state
+        The state to evaluate
+    player : int
+        The player whose utility is maximized
+    table : TranspositionTable | None
+        The table to use, a new unbounded one if None
+    key : Callable[[Any], Hashable]
+        Turns a state into a hashable key, for games whose states contain lists
+    stats : search_stats.SearchStats | None
+        If given, every expanded state is reported with its ply
+    ply : int
+        The ply of state below the root of the whole search, for stats
+    """
+    if table is None:
+        table = TranspositionTable(max_size=None)
+
+    def lookup(s) -> float | None:
+        if game.is_terminal(s):
+            return game.utility(s, player)
+        entry = table.get((player, key(s)))
+        # a bound left by alpha-beta is not enough here
+        return entry[1] if entry is not None and entry[0] == EXACT else None
+
+    value = lookup(state)
+    if value is not None:
+        return value
+
+    if stats is not None:
+        stats.node(ply)
+    # every frame is [state, its actions, index of the next action, best value so far, maximizing]
+    stack = [[state, game.actions(state), 0, None, game.to_move(state) == player]]
+    while stack:
+        frame = stack[-1]
+        s, actions, i, v, maximizing = frame
+        if i == len(actions):
+            stack.pop()
+            table.put((player, key(s)), (EXACT, v))
+            if not stack:
+                return v
+            child_value = v
+            frame = stack[-1]
+        else:
+            frame[2] = i + 1
+            child = game.result(s, actions[i])
+            child_value = lookup(child)
+            if child_value is None:
+                if stats is not None:
+                    stats.node(ply + len(stack))
+                stack.append([child, game.actions(child), 0, None, game.to_move(child) == player])
+                continue
+        # fold the child's value into its parent's frame
+        best = frame[3]
+        if best is None or (child_value > best if frame[4] else child_value < best):
+            frame[3] = child_value
+    return value
+
+
+def minimax_search(
+    game,
+    state,
+    table: TranspositionTable | None = None,
+    key: Callable[[Any], Hashable] = lambda state: state,
+    stats=None,
+):
+    """Returns the best action for the player to move, like halving_game.minimax_search,
+    but every state's value is computed once and then read from the table.
+
+    Passing the same table to every call keeps the results between moves.
+    """
+    if table is None:
+        table = TranspositionTable(max_size=None)
+    player = game.to_move(state)
+    if stats is not None:
+        stats.node(0)
+    best_action = None
+    best_value = -math.inf
+    for a in game.actions(state):
+        v = minimax_value(game, game.result(state, a), player, table, key, stats, 1)
+        if v > best_value:
+            best_value = v
+            best_action = a
+    return best_action
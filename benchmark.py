@@ -0,0 +1,392 @@
+# Benchmarks for the CSP solvers (Assignment 2) and the game searches (Assignment 3).
+# Every case is warmed up, timed over repeated runs and run once more under tracemalloc
+# for its peak memory. The results are compared with benchmark_baseline.json, and the
+# script exits with status 1 if the fastest run of a case is slower than the baseline's
+# fastest run by more than the threshold plus the baseline's own spread (its p90 - min).
+# A case that looks slower is measured again with more runs, and only counts as a
+# regression if it is still too slow, so one noisy run does not fail the gate. The speed of
+# the machine itself drifts (other processes, CPU frequency), so every case also records how
+# long a fixed workload took just before it, and the times are compared relative to that.
+# The import/ cases time importing each solver module in a fresh interpreter, and also
+# fail if it takes longer than --import-budget or prints anything.
+#   python benchmark.py                     # compare with the baseline
+#   python benchmark.py -k sudoku -r 10     # only the cases with "sudoku" in their name
+#   python benchmark.py --save-baseline     # store this run as the new baseline
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from typing import Any
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(ROOT, "Assignment 2"), os.path.join(ROOT, "Assignment 3")]
+
+BASELINE = os.path.join(ROOT, "benchmark_baseline.json")
+
+
+class Case:
+    def __init__(self, name: str, setup: Callable[[], Any], run: Callable[[Any], Any]):
+        """One benchmark, run(setup()) is timed and setup() is not.
+
+        setup() is called again before every run, so a run may change what it gets.
+        """
+        self.name = name
+        self.setup = setup
+        self.run = run
+
+    def measure(self, warmup: int, repeat: int) -> dict[str, Any]:
+        for _ in range(warmup):
+            self.run(self.setup())
+        times = []
+        for _ in range(repeat):
+            data = self.setup()
+            t0 = time.perf_counter()
+            self.run(data)
+            times.append(time.perf_counter() - t0)
+
+        # tracemalloc slows every allocation down, so memory gets its own run
+        data = self.setup()
+        tracemalloc.start()
+        self.run(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        times.sort()
+        return {
+            "repeat": repeat,
+            "min": times[0],
+            "median": statistics.median(times),
+            "p90": percentile(times, 90),
+            "max": times[-1],
+            "peak_memory": peak,
+        }
+
+
+class ImportCase(Case):
+    def __init__(self, module: str, directory: str):
+        """Imports module in a new interpreter, timed by the interpreter itself so its own startup is left out."""
+        super().__init__(f"import/{module}", lambda: None, lambda _: None)
+        self.module = module
+        self.directory = directory
+
+    def run_child(self, memory: bool) -> tuple[float, int]:
+        code = (
+            "import sys, time, tracemalloc\n"
+            f"if {memory}: tracemalloc.start()\n"
+            "t0 = time.perf_counter()\n"
+            f"import {self.module}\n"
+            "elapsed = time.perf_counter() - t0\n"
+            "sys.stderr.write(f'{elapsed} {tracemalloc.get_traced_memory()[1]}')\n"
+        )
+        child = subprocess.run(
+            [sys.executable, "-c", code], cwd=self.directory, capture_output=True, text=True, check=True
+        )
+        if child.stdout:
+            raise RuntimeError(f"importing {self.module} printed {child.stdout[:60]!r}, it should have no side effects")
+        elapsed, peak = child.stderr.split()[-2:]
+        return float(elapsed), int(peak)
+
+    def measure(self, warmup: int, repeat: int) -> dict[str, Any]:
+        # the first import also writes the bytecode cache, so a warmup run matters here too
+        for _ in range(max(warmup, 1)):
+            self.run_child(memory=False)
+        times = sorted(self.run_child(memory=False)[0] for _ in range(repeat))
+        _, peak = self.run_child(memory=True)
+        return {
+            "repeat": repeat,
+            "min": times[0],
+            "median": statistics.median(times),
+            "p90": percentile(times, 90),
+            "max": times[-1],
+            "peak_memory": peak,
+        }
+
+
+def percentile(sorted_times: list[float], p: float) -> float:
+    """Linear interpolation between the closest ranks."""
+    position = (len(sorted_times) - 1) * p / 100
+    low = int(position)
+    high = min(low + 1, len(sorted_times) - 1)
+    return sorted_times[low] + (sorted_times[high] - sorted_times[low]) * (position - low)
+
+
+def calibrate(repeat: int = 5) -> float:
+    """The fastest of repeat runs of a fixed pure Python workload, how fast the machine is right now."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        counts: dict[int, int] = {}
+        for i in range(100_000):
+            counts[i % 1000] = counts.get(i % 1000, 0) + i
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def allowed_time(reference: dict[str, Any], threshold: float, noise_floor: float) -> float:
+    """The slowest fastest-run a case may have against its baseline measurement, on the baseline's machine speed.
+
+    The threshold is relative to the baseline's fastest run, and the baseline's own spread
+    between its fastest run and its p90 is allowed on top, so a case that was noisy when the
+    baseline was stored gets more room.
+    """
+    spread = reference["p90"] - reference["min"]
+    return reference["min"] * (1 + threshold) + max(spread, noise_floor)
+
+
+def normalized(result: dict[str, Any], reference: dict[str, Any]) -> float:
+    """The fastest run of result scaled to the machine speed the reference was measured at."""
+    if "calibration" not in result or "calibration" not in reference:
+        return result["min"]
+    return result["min"] * reference["calibration"] / result["calibration"]
+
+
+# sudoku
+
+def sudoku_file_cases() -> Iterator[Case]:
+    from sudoku import sudoku_csp
+
+    for level in ("easy", "medium", "hard", "very_hard"):
+        with open(os.path.join(ROOT, "Assignment 2", f"sudoku_{level}.txt")) as file:
+            grid = file.read().split()
+        for inference in ("fc", "mac"):
+
+            def run(csp, inference=inference):
+                assert csp.ac_3()
+                assert csp.backtracking_search(inference, "mrv") is not None
+
+            yield Case(f"sudoku/{level}/{inference}", lambda grid=grid: sudoku_csp(grid), run)
+
+
+def generated_sudoku(box_width: int, blanks: float, seed: int) -> str:
+    """A solvable puzzle: a shifted-pattern solution with a fraction of the cells blanked."""
+    from sudoku_topology import SYMBOLS
+
+    width = box_width * box_width
+    rng = random.Random(seed)
+    cells = []
+    for row in range(width):
+        for col in range(width):
+            value = (box_width * (row % box_width) + row // box_width + col) % width
+            cells.append('.' if rng.random() < blanks else SYMBOLS[value])
+    return "".join(cells)
+
+
+def sudoku_size_cases() -> Iterator[Case]:
+    from sudoku_topology import topology_for
+
+    for box_width, blanks in ((2, 0.6), (3, 0.6), (4, 0.5), (5, 0.4)):
+        puzzle = generated_sudoku(box_width, blanks, seed=box_width)
+        width = box_width * box_width
+
+        def run(csp):
+            assert csp.ac_3()
+            assert csp.backtracking_search("fc", "mrv") is not None
+
+        yield Case(f"sudoku/generated/{width}x{width}", lambda puzzle=puzzle: topology_for(puzzle).csp_for(puzzle), run)
+
+
+# graph colouring
+
+def colouring_csp(vertices: int, colours: int, clique: int, density: float, seed: int):
+    """Disjoint cliques of size clique, joined with alldiff, plus random edges between them."""
+    from csp import CSP, alldiff
+
+    rng = random.Random(seed)
+    variables = [f'v{i}' for i in range(vertices)]
+    edges = set()
+    for start in range(0, vertices, clique):
+        edges.update(alldiff(variables[start:start + clique]))
+    for i in range(vertices):
+        for j in range(i + 1, vertices):
+            if i // clique != j // clique and rng.random() < density:
+                edges.add((variables[i], variables[j]))
+    return CSP(variables, {var: set(range(colours)) for var in variables}, sorted(edges))
+
+
+def colouring_cases() -> Iterator[Case]:
+    sizes = ((30, 4, 3, 0.1), (60, 5, 4, 0.08), (120, 6, 5, 0.04), (300, 5, 4, 0.02))
+    for vertices, colours, clique, density in sizes:
+
+        def run(csp):
+            csp.ac_3()
+            csp.backtracking_search("fc", "mrv")
+
+        yield Case(
+            f"colouring/{vertices}v-{colours}c",
+            lambda args=(vertices, colours, clique, density): colouring_csp(*args, seed=args[0]),
+            run,
+        )
+
+
+def random_col_file(vertices: int, edges: int, seed: int) -> str:
+    """Writes a random DIMACS graph to the temp directory the first time, returns its path."""
+    path = os.path.join(tempfile.gettempdir(), f"benchmark-{vertices}v-{edges}e-{seed}.col")
+    if not os.path.exists(path):
+        rng = random.Random(seed)
+        with open(path + ".tmp", "w") as file:
+            file.write(f"p edge {vertices} {edges}\n")
+            for _ in range(edges):
+                u, v = rng.sample(range(1, vertices + 1), 2)
+                file.write(f"e {u} {v}\n")
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def load_cases() -> Iterator[Case]:
+    from constraint_files import load_constraints
+
+    for vertices, edges in ((2_000, 10_000), (20_000, 100_000)):
+        yield Case(
+            f"load/dimacs-{edges // 1000}k",
+            lambda args=(vertices, edges): random_col_file(*args, seed=0),
+            lambda path: load_constraints(path).to_csp(8),
+        )
+
+
+# games
+
+def game_cases() -> Iterator[Case]:
+    import halving_game
+    import tic_tac_toe
+    from bitboard_tic_tac_toe import NEGAMAX_VALUES, best_action
+    from iterative_deepening import iterative_deepening_search
+    from mnk_game import MNKGame
+    import bucket_game
+
+    for n in (20, 40, 60):
+        game = halving_game.Game(n)
+        yield Case(
+            f"games/halving/N={n}",
+            lambda game=game: game,
+            lambda game: halving_game.minimax_search(game, game.initial_state()),
+        )
+
+    bucket = bucket_game.Game()
+    yield Case("games/bucket", lambda: bucket, lambda game: halving_game.minimax_search(game, game.initial_state()))
+
+    ttt = tic_tac_toe.Game()
+    yield Case(
+        "games/tic-tac-toe/alphabeta",
+        lambda: ttt,
+        lambda game: tic_tac_toe.alphabeta_search(game, game.initial_state()),
+    )
+    yield Case("games/tic-tac-toe/bitboard", lambda: (0, 0, 0), best_action)
+
+    def cold_start():
+        # full minimax from an empty memo, or every run after the first would be a lookup
+        NEGAMAX_VALUES.clear()
+        return (0, 0, 0)
+
+    yield Case("games/tic-tac-toe/bitboard-minimax", cold_start, lambda state: best_action(state, prune=False))
+    for m, n, k, depth in ((3, 4, 3, 6), (4, 4, 3, 5)):
+        game = MNKGame(m, n, k)
+        yield Case(
+            f"games/mnk-{m}{n}{k}/depth-{depth}",
+            lambda game=game: game,
+            lambda game, depth=depth: iterative_deepening_search(
+                game, game.initial_state(), game.evaluate, time_limit=None, max_depth=depth
+            ),
+        )
+
+
+# cold start
+
+# the solver modules, which must import fast and without side effects
+# (sudoku_numpy is left out, importing numpy is what it is for)
+SOLVER_MODULES = {
+    "Assignment 2": ("csp", "bitset_csp", "sudoku", "sudoku_topology", "sudoku_batch", "constraint_files"),
+    "Assignment 3": (
+        "halving_game", "bucket_game", "tic_tac_toe", "bitboard_tic_tac_toe", "mnk_game", "transposition",
+        "iterative_deepening", "retrograde", "parallel_search", "mcts", "state_codecs",
+    ),
+}
+
+
+def import_cases() -> Iterator[Case]:
+    for directory, modules in SOLVER_MODULES.items():
+        for module in modules:
+            yield ImportCase(module, os.path.join(ROOT, directory))
+
+
+def all_cases() -> list[Case]:
+    return [*sudoku_file_cases(), *sudoku_size_cases(), *colouring_cases(), *load_cases(), *game_cases(), *import_cases()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Runs the benchmarks and compares them with the stored baseline.")
+    parser.add_argument("-k", "--filter", default="", help="only run the cases whose name contains this")
+    parser.add_argument("-w", "--warmup", type=int, default=1, help="untimed runs per case")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timed runs per case")
+    parser.add_argument("-t", "--threshold", type=float, default=0.25,
+                        help="allowed slowdown of the fastest run, 0.25 is 25%%")
+    parser.add_argument("--noise-floor", type=float, default=0.0005,
+                        help="seconds any case may grow by, for the cases near the timer's resolution")
+    parser.add_argument("--confirm-repeat", type=int, default=15,
+                        help="timed runs of the second measurement of a case that looks slower")
+    parser.add_argument("--import-budget", type=float, default=0.05,
+                        help="seconds a solver module may take to import, whatever the baseline")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("-o", "--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+    print(f"{'case':<34} {'median':>9} {'p90':>9} {'min':>9} {'peak KiB':>9} {'base min':>9} {'change':>8}")
+    for case in all_cases():
+        if args.filter not in case.name:
+            continue
+        speed = calibrate()
+        result = results[case.name] = {**case.measure(args.warmup, args.repeat), "calibration": speed}
+        line = (
+            f"{case.name:<34} {result['median']:>9.4f} {result['p90']:>9.4f} {result['min']:>9.4f}"
+            f" {result['peak_memory'] / 1024:>9.0f}"
+        )
+        if isinstance(case, ImportCase) and result["min"] > args.import_budget:
+            regressions.append(case.name)
+            line += f"  OVER BUDGET ({args.import_budget:.3f} s)"
+        elif case.name in baseline:
+            reference = baseline[case.name]
+            limit = allowed_time(reference, args.threshold, args.noise_floor)
+            if normalized(result, reference) > limit:
+                # confirm with more runs before calling it a regression, keeping the faster measurement
+                speed = calibrate()
+                again = {**case.measure(args.warmup, args.confirm_repeat), "calibration": speed}
+                if normalized(again, reference) < normalized(result, reference):
+                    result = results[case.name] = again
+            change = normalized(result, reference) / reference["min"] - 1
+            line += f" {reference['min']:>9.4f} {change:>+7.0%}"
+            if normalized(result, reference) > limit:
+                regressions.append(case.name)
+                line += "  REGRESSION"
+        print(line, flush=True)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.save_baseline:
+        # cases that were filtered out keep their old baseline
+        with open(args.baseline, "w") as file:
+            json.dump({**baseline, **results}, file, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} cases to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} case(s) slower than the baseline allows: "
+              + ", ".join(regressions), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
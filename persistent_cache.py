@@ -0,0 +1,191 @@
+# A persistent key-value cache in one SQLite file, shared by every run and every process that opens it.
+# Used for solved sudokus (sudoku_batch.py --cache) and searched positions (tic_tac_toe.py --cache),
+# so a puzzle or position that was seen before costs one lookup instead of a search.
+#   cache = PersistentCache("results.db", max_entries=100_000)
+#   solution = cache.get_or_compute(f"sudoku/{puzzle}", lambda: solve(puzzle))
+#   print(cache.stats())
+# Values are pickled, so only open cache files you wrote yourself.
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import time
+from collections.abc import Callable
+from typing import Any
+
+MISSING = object()
+
+# eviction goes down to this fraction of max_entries, so it runs once per many puts instead of on every one
+EVICT_TO = 0.9
+# hits whose last-used time is kept in memory before flush() writes them anyway
+MAX_TOUCHED = 10_000
+
+
+def digest(key: str) -> bytes:
+    # keys are stored as 16 byte hashes, a 25x25 grid would take 625
+    return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+
+class PersistentCache:
+    def __init__(self, path: str, max_entries: int = 100_000):
+        """Opens or creates the cache file at path.
+
+        Keys are strings that should already be canonical, like a formatted grid or a packed
+        state along with the options that change the answer.
+
+        The file is in WAL mode, so readers never wait for a writer, and writers from
+        other processes wait up to 30 seconds for each other. Every entry records when it
+        was last used, and once there are more than max_entries the least recently used
+        ones are deleted, down to 90% of max_entries so that the write lock and the count are
+        taken once per many puts. A hit only updates the entry's last-used time in memory,
+        the times are written by flush(), so lookups do not turn into writes. Hits, misses
+        and evictions are counted per instance, and added to totals in the file by flush()
+        and close(), so the hit rate over all runs can be read back.
+
+        Parameters
+        ----------
+        path : str
+            The SQLite file
+        max_entries : int
+            The size cap, checked after every put() against this instance's count
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key BLOB PRIMARY KEY, value BLOB NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS metrics (name TEXT PRIMARY KEY, count INTEGER NOT NULL)")
+        # only counted exactly when the estimate goes over the cap, other processes add entries too
+        self.entries = self.count()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # the counters when they were last added to the file
+        self.flushed = {"hits": 0, "misses": 0, "evictions": 0}
+        # digest -> last used, for the hits not written yet
+        self.touched: dict[bytes, int] = {}
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        key = digest(key)
+        row = self.connection.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self.touched[key] = time.time_ns()
+        if len(self.touched) >= MAX_TOUCHED:
+            self.write_touched()
+        return pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        key, value, used = digest(key), pickle.dumps(value), time.time_ns()
+        # only a new key counts as an entry, a key put again is updated in place
+        cursor = self.connection.execute(
+            "INSERT INTO cache (key, value, used) VALUES (?, ?, ?) ON CONFLICT (key) DO NOTHING", (key, value, used)
+        )
+        if cursor.rowcount:
+            self.entries += 1
+        else:
+            self.connection.execute("UPDATE cache SET value = ?, used = ? WHERE key = ?", (value, used, key))
+        self.touched.pop(key, None)
+        if self.entries > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries, down to EVICT_TO of max_entries if there are more than max_entries."""
+        # the recent hits count as uses
+        self.write_touched()
+        # one write transaction, so two processes evicting at once do not both delete the excess
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            entries = self.count()
+            deleted = 0
+            if entries > self.max_entries:
+                deleted = self.connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY used LIMIT ?)",
+                    (entries - int(self.max_entries * EVICT_TO),),
+                ).rowcount
+        except BaseException:
+            # nothing half deleted is kept
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        self.evictions += deleted
+        self.entries = entries - deleted
+
+    def write_touched(self):
+        """Writes the last-used times of the hits since the last call."""
+        if not self.touched:
+            return
+        # one transaction, the connection commits every statement on its own otherwise
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.executemany(
+                "UPDATE cache SET used = ? WHERE key = ?", [(used, key) for key, used in self.touched.items()]
+            )
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        self.touched.clear()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for key, or computes, stores and returns it."""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return self.connection.execute("SELECT 1 FROM cache WHERE key = ?", (digest(key),)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def stats(self) -> dict[str, int | float]:
+        """The counters of this instance, and the hit rate over everything recorded in the file."""
+        lookups = self.hits + self.misses
+        totals = dict(self.connection.execute("SELECT name, count FROM metrics").fetchall())
+        for name, count in self.flushed.items():
+            totals[name] = totals.get(name, 0) + getattr(self, name) - count
+        total_lookups = totals.get("hits", 0) + totals.get("misses", 0)
+        return {
+            "entries": self.count(),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hit_rate": totals.get("hits", 0) / total_lookups if total_lookups else 0.0,
+            "file_bytes": os.path.getsize(self.path),
+        }
+
+    def flush(self):
+        """Writes the last-used times of the recent hits, and adds the counts since the last flush to the totals in the file."""
+        self.write_touched()
+        counts = [(name, getattr(self, name) - count) for name, count in self.flushed.items()]
+        self.connection.executemany(
+            "INSERT INTO metrics (name, count) VALUES (?, ?)"
+            " ON CONFLICT (name) DO UPDATE SET count = count + excluded.count",
+            counts,
+        )
+        self.flushed = {name: getattr(self, name) for name in self.flushed}
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self) -> "PersistentCache":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,150 @@
+# Search statistics shared by the CSP solvers (Assignment 2) and the game searches (Assignment 3).
+# The searches take a stats=None argument and only call it as `if stats is not None: stats.node(ply)`,
+# so any object with the same methods works and a disabled hook costs one comparison per event.
+#   stats = SearchStats("runs.jsonl")
+#   with stats.run("sudoku_hard", inference="mac", variable_ordering="mrv"):
+#       csp.backtracking_search("mac", "mrv", stats=stats)
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, TextIO
+
+
+def count_at(counts: list[int], depth: int):
+    """Adds one to counts[depth], growing counts with zeros if it is shorter."""
+    if depth < len(counts):
+        counts[depth] += 1
+    else:
+        counts.extend([0] * (depth - len(counts)) + [1])
+
+
+class SearchStats:
+    def __init__(self, output: str | TextIO | None = None):
+        """Collects counters for one search run at a time and exports every run as a JSON line.
+
+        Parameters
+        ----------
+        output : str | TextIO | None
+            A path to append the JSON lines to, an open text file, or None to only keep
+            the records in self.records
+        """
+        self.output = output
+        self.records: list[dict[str, Any]] = []
+        self.start("")
+
+    def start(self, name: str, **config):
+        """Resets the counters for a new run, config is copied to the record as is."""
+        self.name = name
+        self.config = config
+        self.nodes = 0
+        self.prunings = 0
+        self.revisions = 0
+        self.removed_values = 0
+        # nodes_per_depth[d] is the number of nodes visited d plies below the root
+        self.nodes_per_depth: list[int] = []
+        # prunings_per_depth[d] is the number of subtrees cut off d plies below the root
+        self.prunings_per_depth: list[int] = []
+        # time_per_depth[d] is the seconds spent on the iteration with depth limit d
+        self.time_per_depth: dict[int, float] = {}
+        self.start_time = self.iteration_time = time.perf_counter()
+
+    def node(self, depth: int):
+        """A node was visited depth plies below the root."""
+        self.nodes += 1
+        count_at(self.nodes_per_depth, depth)
+
+    def prune(self, depth: int):
+        """A subtree depth plies below the root was cut off, by alpha-beta or by a failed check."""
+        self.prunings += 1
+        count_at(self.prunings_per_depth, depth)
+
+    def revision(self, removed: int):
+        """Arc consistency or forward checking removed values from a domain."""
+        self.revisions += 1
+        self.removed_values += removed
+
+    def iteration(self, depth: int):
+        """An iterative deepening iteration with depth limit depth finished."""
+        now = time.perf_counter()
+        self.time_per_depth[depth] = now - self.iteration_time
+        self.iteration_time = now
+
+    @property
+    def max_depth(self) -> int:
+        return len(self.nodes_per_depth) - 1
+
+    def effective_branching_factor(self) -> float:
+        """Returns b such that a uniform tree of depth max_depth with branching b has self.nodes nodes."""
+        depth = self.max_depth
+        if depth <= 0:
+            return 0.0
+
+        def tree_size(b: float) -> float:
+            size, level = 0.0, 1.0
+            for _ in range(depth + 1):
+                size += level
+                level *= b
+                if size > self.nodes:
+                    break
+            return size
+
+        # b ** depth <= nodes, so b is at most the depth-th root of nodes
+        low, high = 0.0, max(2.0, self.nodes ** (1 / depth))
+        for _ in range(64):
+            middle = (low + high) / 2
+            if tree_size(middle) < self.nodes:
+                low = middle
+            else:
+                high = middle
+        return round((low + high) / 2, 4)
+
+    def finish(self, **result) -> dict[str, Any]:
+        """Ends the run, appends its record to self.records and to the output, and returns it.
+
+        time_per_depth is only in the record if iteration() was called, the other searches have no iterations.
+        """
+        record = {
+            "name": self.name,
+            "config": self.config,
+            "time": time.perf_counter() - self.start_time,
+            "nodes": self.nodes,
+            "prunings": self.prunings,
+            "revisions": self.revisions,
+            "removed_values": self.removed_values,
+            "max_depth": self.max_depth,
+            "effective_branching_factor": self.effective_branching_factor(),
+            "nodes_per_depth": self.nodes_per_depth,
+            "prunings_per_depth": self.prunings_per_depth,
+            **({"time_per_depth": self.time_per_depth} if self.time_per_depth else {}),
+            **result,
+        }
+        self.records.append(record)
+        line = json.dumps(record, default=str) + "\n"
+        if isinstance(self.output, str):
+            with open(self.output, "a") as file:
+                file.write(line)
+        elif self.output is not None:
+            self.output.write(line)
+        return record
+
+    @contextmanager
+    def run(self, name: str, **config):
+        """Wraps start() and finish() around a block.
+
+        The record gets "completed": True, or False and the "error" if the block raises,
+        in which case the run is recorded and the error raised again.
+        """
+        self.start(name, **config)
+        try:
+            yield self
+        except BaseException as error:
+            self.finish(completed=False, error=repr(error))
+            raise
+        self.finish(completed=True)
+
+
+def read_records(path: str) -> list[dict[str, Any]]:
+    """Reads back the JSON lines written by SearchStats."""
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]